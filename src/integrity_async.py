@@ -0,0 +1,151 @@
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional, Set
+
+class AsyncLoopThread:
+    """
+    Process-wide asyncio event loop running in a daemon thread.
+
+    Coroutines from the API layer are submitted here from any thread, so
+    network calls run concurrently with capture and OCR instead of blocking
+    the thread that started them.
+    """
+    _instance: Optional['AsyncLoopThread'] = None
+
+    def __init__(self):
+        if AsyncLoopThread._instance is not None:
+            raise RuntimeError("Use AsyncLoopThread.get_instance() instead")
+
+        self.logger = logging.getLogger("IntegrityCore.AsyncLoopThread")
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="IntegrityAsyncLoop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+        AsyncLoopThread._instance = self
+
+    @staticmethod
+    def get_instance() -> 'AsyncLoopThread':
+        if AsyncLoopThread._instance is None:
+            AsyncLoopThread()
+        return AsyncLoopThread._instance
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        if self.in_loop_thread():
+            raise RuntimeError("AsyncLoopThread.run() would deadlock on the loop thread")
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout: float = 5):
+        """Cancel outstanding tasks and stop the loop"""
+        if not self.loop.is_running():
+            return
+
+        async def cancel_tasks():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(cancel_tasks()).result(timeout)
+        except Exception as e:
+            self.logger.warning(f"Failed to cancel pending tasks: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        AsyncLoopThread._instance = None
+
+
+class TkAsyncBridge:
+    """
+    Runs coroutines on the shared AsyncLoopThread and hands their results
+    back to the Tk thread.
+
+    Tk is not thread-safe, so nothing here touches widgets from the loop.
+    Completions and call_in_ui() requests go into a queue that a
+    widget.after callback drains on the Tk thread while work is pending.
+    """
+
+    def __init__(self, widget, poll_interval: int = 16):
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.loop_thread = AsyncLoopThread.get_instance()
+        self.logger = logging.getLogger("IntegrityCore.TkAsyncBridge")
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Set[Future] = set()
+        self._polling = False
+
+    def submit(self, coro: Awaitable, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None) -> Future:
+        """
+        Run a coroutine on the loop thread. Must be called from the Tk thread.
+        Args:
+            coro: Coroutine to run
+            on_done: Called on the Tk thread with the coroutine's result
+            on_error: Called on the Tk thread with the exception it raised
+        """
+        future = self.loop_thread.submit(coro)
+        self._pending.add(future)
+        future.add_done_callback(lambda done: self._queue.put((self._complete, (done, on_done, on_error))))
+        self._schedule_poll()
+        return future
+
+    def call_in_ui(self, func: Callable, *args):
+        """Run func(*args) on the Tk thread; safe to call from coroutines"""
+        self._queue.put((func, args))
+
+    def _complete(self, future: Future, on_done: Optional[Callable], on_error: Optional[Callable]):
+        self._pending.discard(future)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if on_done is not None:
+                on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            self.logger.error("Background task failed", exc_info=error)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.error(f"UI callback failed: {e}", exc_info=True)
+
+        # Keep polling only while work is outstanding
+        self._polling = False
+        if self._pending:
+            self._schedule_poll()
+
+    def close(self):
+        """Cancel coroutines that have not finished yet"""
+        for future in list(self._pending):
+            future.cancel()
+        self._pending.clear()
@@ -14,7 +14,54 @@ class ConfigManager:
         "analysis": {
             "threads": 4,
             "timeout": 300,
-            "max_file_size": 1024 * 1024 * 100  # 100MB
+            "ocr_languages": ["en"],
+            "gpu": False,
+            "preprocess_profile": "balanced",  # fast, balanced or quality
+            "max_file_size": 1024 * 1024 * 100,  # 100MB
+            "capture_targets": [{"monitor": 0}],  # monitors, regions or windows to analyze
+            "capture_interval": 2.0,  # initial seconds between captures when monitoring
+            "monitor_min_interval": 0.5,  # fastest capture rate while the screen changes
+            "monitor_max_interval": 10.0,  # slowest capture rate while idle
+            "monitor_backoff": 1.5,  # interval growth per unchanged capture
+            "monitor_cpu_budget": 10.0,  # percent of total CPU monitoring may use
+            "snapshot_interval": 60,  # min seconds between snapshots of a changed screen
+            "snapshot_queue_size": 4,  # pending snapshots before the oldest is dropped
+            "snapshot_max_age_days": 7,
+            "snapshot_max_bytes": 1_000_000_000,  # 1GB
+            "snapshot_max_files": 10000,
+            "snapshot_keyframe_ratio": 0.3,  # changed fraction that forces a new keyframe
+            "snapshot_keyframe_interval": 3600,  # max seconds between keyframes
+            "history_max_age_days": 30,  # how long OCR results stay searchable
+            "change_threshold": 3.0,  # mean gray-level change that triggers OCR
+            "tile_size": 256,  # dirty-region OCR grid, in pixels
+            "tile_diff_threshold": 32,  # gray-level change that marks a tile dirty
+            "tile_margin": 16,  # pixels of context around re-recognized regions
+            "full_pass_ratio": 0.5,  # dirty fraction above which the whole frame is re-read
+            "batch_size": 16,  # text regions per recognition batch
+            "batch_canvas_size": 2560,  # max side of canvases crops are packed onto
+            "batch_padding": 32,  # gap between packed crops
+            "ocr_cache_entries": 512,  # in-memory OCR results keyed by image content
+            "ocr_cache_disk": True,  # keep evicted results on disk as well
+            "ocr_cache_max_bytes": 64 * 1024 * 1024  # 64MB on-disk cache
+        },
+        "network": {
+            "api_base_url": "https://integrity-server.up.railway.app",  # integrity_mock_server.py for local testing
+            "max_connections": 8,  # pooled keep-alive connections to the API server
+            "max_concurrent_requests": 4,  # API requests in flight at once
+            "usage_batch_size": 50,  # usage rows per Supabase insert
+            "usage_flush_interval": 60,  # max seconds a usage row waits before it is sent
+            "quota_sync_interval": 30,  # max seconds a locally counted question waits before it is synced
+            "session_refresh_margin": 300,  # seconds before token expiry to refresh the session
+            "outbox_concurrency": 2,  # queued requests delivered at once
+            "retry_base_delay": 1.0,  # first retry delay, doubled on every failure
+            "retry_max_delay": 300.0  # longest wait between retries
+        },
+        "upload": {
+            "max_dimension": 1920,  # longest side of uploaded screenshots, 0 to keep full size
+            "color_mode": "gray",  # color, gray or binary
+            "format": "webp",  # webp, jpeg or png
+            "quality": 80,  # lossy WebP/JPEG quality
+            "changed_tiles_only": False  # upload only the area changed since the last upload
         }
     }
     
@@ -1,54 +1,459 @@
 import os
 import sys
 import logging
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, List
+from datetime import datetime
 import numpy as np
 import cv2
 from PIL import Image
 import mss
 import mss.tools
-import easyocr
 import time
 import shutil
+from integrity_preprocess import PREPROCESS_PROFILES, DEFAULT_PROFILE, benchmark_profiles, dirty_tile_mask
+from integrity_snapshots import SnapshotArchive, SnapshotWriter, SnapshotIndex
+from integrity_history import OCRHistory
+from integrity_scheduler import AdaptiveScheduler
+from integrity_ocr import OCRReaderCache, OCRResultCache, OCRWorkerPool, OCRResult, pack_crops, unpack_results
+
+# Size of the thumbnail used for change detection. INTER_AREA downsampling
+# averages each block, so comparing thumbnails is a block-wise mean diff.
+SIGNATURE_SIZE = (64, 36)
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Downsample a frame to a small grayscale thumbnail for change detection"""
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+
+def signature_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Largest block-wise mean absolute difference between two signatures"""
+    return float(cv2.absdiff(a, b).max())
+
+def find_window_region(title: str) -> Optional[Dict[str, int]]:
+    """
+    Locate the first visible top-level window whose title contains title
+    Returns:
+        MSS region dict, or None if nothing matched. Window lookup is only
+        supported on Windows.
+    """
+    if sys.platform != "win32":
+        logging.getLogger("IntegrityCore").warning("Window capture is only supported on Windows")
+        return None
+    
+    import ctypes
+    from ctypes import wintypes
+    user32 = ctypes.windll.user32
+    needle = title.lower()
+    matches = []
+    
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def visit(hwnd, _):
+        if user32.IsWindowVisible(hwnd) and not user32.IsIconic(hwnd):
+            length = user32.GetWindowTextLengthW(hwnd)
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            if needle in buffer.value.lower():
+                matches.append(hwnd)
+                return False
+        return True
+    
+    user32.EnumWindows(visit, 0)
+    if not matches:
+        return None
+    
+    rect = wintypes.RECT()
+    user32.GetWindowRect(matches[0], ctypes.byref(rect))
+    return {"left": rect.left, "top": rect.top, "width": rect.right - rect.left, "height": rect.bottom - rect.top}
+
+def merge_dirty_tiles(mask: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    Merge connected dirty tiles into bounding rectangles
+    Returns:
+        List of (row0, col0, row1, col1) rectangles in tile units, end exclusive
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    regions = []
+    for label in range(1, count):
+        col, row, width, height = stats[label][:4]
+        regions.append((int(row), int(col), int(row + height), int(col + width)))
+    return regions
+
+class CaptureTarget:
+    """
+    One area of the screen to capture and analyze: a monitor, a fixed region
+    or an application window. Each target carries its own analysis setting
+    overrides along with its frame buffers and dirty-region tile cache.
+    """
+    
+    def __init__(self, name: str, monitor: Optional[int] = None, region: Optional[Dict[str, int]] = None,
+                 window: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.monitor = monitor
+        self.region = region
+        self.window = window
+        self.settings = dict(settings or {})
+        
+        # Area grabbed by the last capture, in virtual screen coordinates
+        self.bounds: Optional[Dict[str, int]] = None
+        
+        # The last capture is kept as the raw MSS BGRA buffer plus a grayscale
+        # copy; the BGR frame is only materialized when something asks for it
+        self._last_bgra: Optional[np.ndarray] = None
+        self._last_color: Optional[np.ndarray] = None
+        self.last_gray: Optional[np.ndarray] = None
+        self._gray_buffers: List[np.ndarray] = []
+        self.last_ocr_signature: Optional[np.ndarray] = None
+        self.last_result = OCRResult()
+        
+        # Dirty-region OCR state: the frame the tile map was built from and
+        # the OCR results cached per (row, col) tile
+        self._prev_gray: Optional[np.ndarray] = None
+        self._tile_size = 0
+        self._tile_results: Dict[Tuple[int, int], OCRResult] = {}
+    
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> 'CaptureTarget':
+        """
+        Build a target from a config entry such as {"monitor": 1},
+        {"region": {"left": 0, "top": 0, "width": 800, "height": 600}} or
+        {"window": "Visual Studio Code"}. Any other keys override analysis
+        settings for this target, e.g. "preprocess_profile".
+        """
+        spec = dict(spec)
+        monitor = spec.pop("monitor", None)
+        region = spec.pop("region", None)
+        window = spec.pop("window", None)
+        name = spec.pop("name", None)
+        
+        if monitor is None and region is None and window is None:
+            monitor = 0
+        if name is None:
+            if window is not None:
+                name = f"window:{window}"
+            elif region is not None:
+                name = "region:{left},{top},{width}x{height}".format(**region)
+            else:
+                name = f"monitor:{monitor}"
+        
+        return cls(name, monitor, region, window, spec)
+    
+    def resolve(self, sct) -> Optional[Dict[str, int]]:
+        """
+        Work out the area to grab, clipped to the virtual screen
+        Returns:
+            MSS region dict, or None if the target is not currently on screen
+        """
+        if self.monitor is not None:
+            if not 0 <= self.monitor < len(sct.monitors):
+                raise ValueError(f"Monitor {self.monitor} does not exist")
+            return dict(sct.monitors[self.monitor])
+        
+        area = self.region if self.region is not None else find_window_region(self.window)
+        if area is None:
+            return None
+        
+        screen = sct.monitors[0]
+        left = max(area["left"], screen["left"])
+        top = max(area["top"], screen["top"])
+        right = min(area["left"] + area["width"], screen["left"] + screen["width"])
+        bottom = min(area["top"] + area["height"], screen["top"] + screen["height"])
+        if right <= left or bottom <= top:
+            return None
+        return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+    
+    @property
+    def raw_frame(self) -> Optional[np.ndarray]:
+        """The last capture without conversion: BGRA from MSS, or BGR after a fallback capture"""
+        return self._last_bgra if self._last_bgra is not None else self._last_color
+    
+    @property
+    def last_screenshot(self) -> Optional[np.ndarray]:
+        """Color (BGR) version of the last capture, converted on first access"""
+        if self._last_color is None and self._last_bgra is not None:
+            self._last_color = cv2.cvtColor(self._last_bgra, cv2.COLOR_BGRA2BGR)
+        return self._last_color
+    
+    @last_screenshot.setter
+    def last_screenshot(self, frame: Optional[np.ndarray]):
+        self._last_bgra = None
+        self._last_color = frame
+        self.last_gray = None if frame is None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def store_capture(self, screenshot):
+        """
+        Wrap the raw BGRA buffer of an MSS screenshot without copying and
+        convert it straight to grayscale into a reused buffer
+        """
+        bgra = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+            screenshot.height, screenshot.width, 4
+        )
+        gray = self._next_gray_buffer(screenshot.height, screenshot.width)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=gray)
+        
+        self._last_bgra = bgra
+        self._last_color = None
+        self.last_gray = gray
+    
+    def _next_gray_buffer(self, height: int, width: int) -> np.ndarray:
+        """
+        Preallocated grayscale output buffer for the next capture. Two buffers
+        alternate so the frame the tile map was built from is never overwritten.
+        """
+        if not self._gray_buffers or self._gray_buffers[0].shape != (height, width):
+            self._gray_buffers = [np.empty((height, width), dtype=np.uint8) for _ in range(2)]
+        
+        if self._gray_buffers[0] is self._prev_gray:
+            return self._gray_buffers[1]
+        return self._gray_buffers[0]
+    
+    def has_changed(self, threshold: float) -> bool:
+        """
+        Check whether the last capture differs perceptually from the last
+        capture that went through OCR
+        """
+        if self.last_gray is None or self.last_ocr_signature is None:
+            return True
+        return signature_distance(frame_signature(self.last_gray), self.last_ocr_signature) > threshold
+    
+    def dirty_regions(self, tile_size: int, diff_threshold: int, full_pass_ratio: float) -> List[Tuple[int, int, int, int]]:
+        """
+        Find the tile rectangles that changed since the previous OCR pass
+        Returns:
+            List of (row0, col0, row1, col1) rectangles in tile units, end exclusive
+        """
+        gray = self.last_gray
+        h, w = gray.shape
+        rows = -(-h // tile_size)
+        cols = -(-w // tile_size)
+        
+        # A new geometry invalidates the whole tile map
+        if (self._prev_gray is None or self._prev_gray.shape != gray.shape
+                or tile_size != self._tile_size):
+            self._tile_size = tile_size
+            self._tile_results = {}
+            return [(0, 0, rows, cols)]
+        
+        mask = dirty_tile_mask(gray, self._prev_gray, tile_size, diff_threshold)
+        if not mask.any():
+            return []
+        
+        # Past this point one full pass is cheaper than many small ones
+        if mask.mean() >= full_pass_ratio:
+            return [(0, 0, rows, cols)]
+        
+        return merge_dirty_tiles(mask)
+    
+    def region_bounds(self, region: Tuple[int, int, int, int], margin: int = 0) -> Tuple[int, int, int, int]:
+        """Pixel bounds (x0, y0, x1, y1) of a tile rectangle, padded by margin"""
+        r0, c0, r1, c1 = region
+        ts = self._tile_size
+        h, w = self.last_gray.shape
+        return (max(0, c0 * ts - margin), max(0, r0 * ts - margin),
+                min(w, c1 * ts + margin), min(h, r1 * ts + margin))
+    
+    def splice_region(self, region: Tuple[int, int, int, int], origin: Tuple[int, int], results: OCRResult):
+        """Replace the cached results of a tile rectangle with fresh OCR output"""
+        r0, c0, r1, c1 = region
+        ts = self._tile_size
+        
+        for row in range(r0, r1):
+            for col in range(c0, c1):
+                self._tile_results.pop((row, col), None)
+        
+        result = results.with_source(self.name).translate(*origin)
+        if not len(result):
+            return
+        
+        tiles = (result.centers() // ts).astype(np.int64)
+        rows, cols = tiles[:, 1], tiles[:, 0]
+        
+        # Text centered in the margin belongs to an unchanged neighbour
+        inside = (rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1)
+        for row, col in set(zip(rows[inside].tolist(), cols[inside].tolist())):
+            self._tile_results[(row, col)] = result.select(inside & (rows == row) & (cols == col))
+    
+    def invalidate_region(self, region: Tuple[int, int, int, int]) -> bool:
+        """
+        Keep a timed-out region dirty so the next pass retries it
+        Returns:
+            False if there is no previous frame to diff against and the
+            next pass must read the whole frame
+        """
+        gray = self.last_gray
+        if self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            return False
+        
+        x0, y0, x1, y1 = self.region_bounds(region)
+        gray[y0:y1, x0:x1] = self._prev_gray[y0:y1, x0:x1]
+        return True
+    
+    def finish_pass(self, reusable: bool):
+        """Remember the frame just read as the reference for the next diff"""
+        self._prev_gray = self.last_gray if reusable else None
+        self.last_ocr_signature = frame_signature(self.last_gray)
+    
+    def tile_result(self) -> OCRResult:
+        """All cached tile results merged, in target coordinates"""
+        return OCRResult.concat(list(self._tile_results.values()))
 
 class ScreenAnalyzer:
-    def __init__(self):
-        self.last_screenshot = None
-        self.reader = None  # Initialize OCR reader only when needed
+    def __init__(self, config=None, on_snapshot_saved: Optional[Callable[[str, datetime], None]] = None,
+                 on_snapshots_removed: Optional[Callable[[List[str]], None]] = None):
+        """
+        Args:
+            config: ConfigManager providing the analysis.* settings
+            on_snapshot_saved: Called from the writer thread with the filename
+                and capture timestamp of each archived snapshot
+            on_snapshots_removed: Called with the filenames retention deletes
+        """
+        self.config = config
+        self.ocr_pool: Optional[OCRWorkerPool] = None  # Started only when needed
         self.logger = logging.getLogger("IntegrityCore.ScreenAnalyzer")
         self.last_save_time = 0
+        self.on_snapshot_saved = on_snapshot_saved
+        # Capture timestamp of the snapshot queued for the latest frame, if any
+        self.last_capture_snapshot: Optional[datetime] = None
+        self._snapshot_signature: Optional[np.ndarray] = None
+        self.last_result = OCRResult()
+        self.targets: List[CaptureTarget] = [
+            CaptureTarget.from_spec(spec) for spec in self._setting("capture_targets", [{"monitor": 0}])
+        ] or [CaptureTarget.from_spec({"monitor": 0})]
+        
+        # MSS handles are not safe to share between threads, so each thread
+        # (UI, monitoring loop) lazily opens its own
+        self._local = threading.local()
         self.images_dir = os.path.join(os.path.expanduser('~'), 'IntegrityAssistant', 'images')
         os.makedirs(self.images_dir, exist_ok=True)
+        self.snapshot_index = SnapshotIndex(self.images_dir, on_removed=on_snapshots_removed)
         self.cleanup_old_images()
         
+        # Recurring screen states are answered from this cache instead of OCR
+        self.ocr_cache = OCRResultCache(
+            max_entries=self._setting("ocr_cache_entries", 512),
+            cache_dir=os.path.join(os.path.expanduser('~'), 'IntegrityAssistant', 'ocr_cache')
+            if self._setting("ocr_cache_disk", True) else None,
+            max_disk_bytes=self._setting("ocr_cache_max_bytes", 64 * 1024 * 1024),
+            max_age=self._setting("history_max_age_days", 30) * 86400
+        )
+        
+        # Encoding and retention run on the writer thread, off the capture path
+        self.snapshot_archive = SnapshotArchive(
+            self.images_dir,
+            keyframe_ratio=self._setting("snapshot_keyframe_ratio", 0.3),
+            keyframe_interval=self._setting("snapshot_keyframe_interval", 3600)
+        )
+        self.snapshot_writer = SnapshotWriter(
+            self.snapshot_archive,
+            max_queue=self._setting("snapshot_queue_size", 4),
+            on_saved=self._on_snapshot_saved
+        )
+        
         # Initialize screen capture
         try:
-            self.sct = mss.mss()
-            self.monitor = self.sct.monitors[0]  # Primary monitor
-            self.logger.info(f"Screen capture initialized. Monitor: {self.monitor}")
+            self.monitor = self.sct.monitors[0]  # All monitors combined
+            self.logger.info(
+                f"Screen capture initialized. Monitors: {self.sct.monitors[1:]}, "
+                f"targets: {[target.name for target in self.targets]}"
+            )
         except Exception as e:
             self.logger.error(f"Failed to initialize screen capture: {str(e)}")
             raise
     
+    @property
+    def sct(self):
+        """Screen capture handle owned by the calling thread"""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+    
+    def _setting(self, key: str, default: Any) -> Any:
+        """Read an analysis setting, falling back to the default without a config"""
+        if self.config is None:
+            return default
+        return self.config.get(f"analysis.{key}", default)
+    
+    def _target_setting(self, target: CaptureTarget, key: str, default: Any) -> Any:
+        """Read an analysis setting, preferring the target's own override"""
+        if key in target.settings:
+            return target.settings[key]
+        return self._setting(key, default)
+    
+    def set_capture_targets(self, specs: List[Dict[str, Any]]) -> List[CaptureTarget]:
+        """
+        Replace what gets captured and analyzed
+        Args:
+            specs: Target specs as accepted by CaptureTarget.from_spec
+        """
+        targets = [CaptureTarget.from_spec(spec) for spec in specs]
+        if not targets:
+            raise ValueError("At least one capture target is required")
+        self.targets = targets
+        self.logger.info(f"Capture targets set to {[target.name for target in targets]}")
+        return targets
+    
+    def select_monitors(self, monitors: List[int], **settings) -> List[CaptureTarget]:
+        """Analyze the given monitors (1-based as in MSS; 0 is all monitors combined)"""
+        return self.set_capture_targets([dict(settings, monitor=index) for index in monitors])
+    
+    def select_region(self, left: int, top: int, width: int, height: int, **settings) -> CaptureTarget:
+        """Analyze a fixed region of the virtual screen"""
+        region = {"left": left, "top": top, "width": width, "height": height}
+        return self.set_capture_targets([dict(settings, region=region)])[0]
+    
+    def select_window(self, title: str, **settings) -> CaptureTarget:
+        """Analyze only the area of the first visible window whose title contains title"""
+        return self.set_capture_targets([dict(settings, window=title)])[0]
+    
+    @property
+    def primary_target(self) -> CaptureTarget:
+        return self.targets[0]
+    
+    @property
+    def last_screenshot(self) -> Optional[np.ndarray]:
+        """Color (BGR) frame of the primary target, converted on first access"""
+        return self.primary_target.last_screenshot
+    
+    @property
+    def last_gray(self) -> Optional[np.ndarray]:
+        """Grayscale frame of the primary target"""
+        return self.primary_target.last_gray
+    
+    def has_changed(self) -> bool:
+        """
+        Check whether any target differs perceptually from the last capture
+        of it that went through OCR
+        """
+        return any(
+            target.has_changed(self._target_setting(target, "change_threshold", 3.0))
+            for target in self.targets if target.last_gray is not None
+        )
+    
     def capture_screen(self) -> np.ndarray:
-        """Capture the current screen optimized for OCR"""
+        """
+        Capture every target, optimized for OCR
+        Returns:
+            Grayscale frame of the primary target; color frames are available
+            as last_screenshot on each target
+        """
+        targets = self.targets
         try:
             # Capture screen using MSS (fast and reliable)
-            screenshot = self.sct.grab(self.monitor)
-            
-            # Convert to numpy array
-            frame = np.array(screenshot)
-            
-            # Convert from BGRA to BGR
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-            
-            self.last_screenshot = frame
+            for target in targets:
+                target.bounds = target.resolve(self.sct)
+                if target.bounds is None:
+                    self.logger.debug(f"Capture target {target.name} is not on screen")
+                    continue
+                target.store_capture(self.sct.grab(target.bounds))
             
             # Save periodic snapshot if needed
             self._save_periodic_snapshot()
             
-            return self.last_screenshot
+            return self.last_gray
             
         except Exception as e:
             self.logger.error(f"Screen capture failed: {str(e)}")
@@ -57,166 +462,331 @@ class ScreenAnalyzer:
             try:
                 # Fallback to PIL ImageGrab if MSS fails
                 with mss.mss() as sct:
-                    screenshot = sct.grab(sct.monitors[0])
-                    frame = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-                    frame = np.array(frame)
-                    self.last_screenshot = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                    return self.last_screenshot
+                    for target in targets:
+                        target.bounds = target.resolve(sct)
+                        if target.bounds is None:
+                            continue
+                        screenshot = sct.grab(target.bounds)
+                        frame = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
+                        frame = np.array(frame)
+                        target.last_screenshot = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                    return self.last_gray
             except Exception as fallback_error:
                 self.logger.error(f"Fallback capture also failed: {str(fallback_error)}")
                 raise
 
     def _save_periodic_snapshot(self):
-        """Save screenshot every minute"""
+        """
+        Queue a screenshot for the background writer every snapshot_interval
+        seconds, skipping frames that look the same as the last snapshot
+        """
+        self.last_capture_snapshot = None
         current_time = time.time()
-        if current_time - self.last_save_time >= 60:  # 1 minute interval
-            try:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = os.path.join(self.images_dir, f"snapshot_{timestamp}.jpg")
-                
-                # Save as JPEG with good quality (95)
-                cv2.imwrite(filename, self.last_screenshot, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                
-                self.last_save_time = current_time
-                self.logger.debug(f"Saved periodic snapshot: {filename}")
-                
-                # Cleanup old images after saving new one
-                self.cleanup_old_images()
-                
-            except Exception as e:
-                self.logger.error(f"Failed to save periodic snapshot: {str(e)}")
+        target = self.primary_target
+        frame = target.raw_frame
+        if frame is None or current_time - self.last_save_time < self._setting("snapshot_interval", 60):
+            return
+        
+        signature = frame_signature(target.last_gray)
+        if (self._snapshot_signature is not None
+                and signature_distance(signature, self._snapshot_signature) <= self._setting("change_threshold", 3.0)):
+            return
+        
+        timestamp = datetime.now()
+        self.snapshot_writer.submit(frame, timestamp)
+        self.last_capture_snapshot = timestamp
+        self.last_save_time = current_time
+        self._snapshot_signature = signature
     
     def cleanup_old_images(self):
-        """Remove images older than one week"""
+        """Remove snapshots older than one week and trim the store to its size limits"""
         try:
-            current_time = datetime.now()
-            week_ago = current_time - timedelta(days=7)
-            
-            for filename in os.listdir(self.images_dir):
-                if not filename.startswith("snapshot_"):
-                    continue
-                
-                filepath = os.path.join(self.images_dir, filename)
-                file_time = datetime.strptime(filename.split("_")[1].split(".")[0], "%Y%m%d_%H%M%S")
-                
-                if file_time < week_ago:
-                    os.remove(filepath)
-                    self.logger.debug(f"Removed old snapshot: {filename}")
-            
-            # Check directory size and clean up if too large
-            dir_size = sum(os.path.getsize(os.path.join(self.images_dir, f)) 
-                          for f in os.listdir(self.images_dir))
-            if dir_size > 1_000_000_000:  # 1GB
-                self.logger.warning("Images directory exceeds 1GB, performing cleanup")
-                files = sorted(
-                    [(f, os.path.getmtime(os.path.join(self.images_dir, f))) 
-                     for f in os.listdir(self.images_dir) if f.startswith("snapshot_")],
-                    key=lambda x: x[1]
-                )
-                # Keep only the newest 10000 files
-                for filename, _ in files[:-10000]:
-                    os.remove(os.path.join(self.images_dir, filename))
-                
+            removed = self.snapshot_index.expire(
+                max_age=self._setting("snapshot_max_age_days", 7) * 86400,
+                max_bytes=self._setting("snapshot_max_bytes", 1_000_000_000),  # 1GB
+                max_files=self._setting("snapshot_max_files", 10000)
+            )
+            if removed:
+                self.logger.debug(f"Removed {removed} old snapshots")
         except Exception as e:
             self.logger.error(f"Failed to cleanup old images: {str(e)}")
-
+    
+    def _on_snapshot_saved(self, filename: str, timestamp: datetime, size: int, keyframe: Optional[str]):
+        """Index a snapshot written by the background writer, then apply retention"""
+        self.snapshot_index.add(filename, timestamp, size, keyframe)
+        if self.on_snapshot_saved is not None:
+            self.on_snapshot_saved(os.path.basename(filename), timestamp)
+        self.cleanup_old_images()
+    
+    def load_snapshot(self, filename: str) -> np.ndarray:
+        """Rebuild the full BGR frame of a stored snapshot, keyframe or delta"""
+        return self.snapshot_archive.load(filename)
+    
+    def close(self):
+        """Stop the OCR pool and snapshot writer and release MSS resources"""
+        if getattr(self, "ocr_pool", None) is not None:
+            self.ocr_pool.shutdown()
+            self.ocr_pool = None
+        if getattr(self, "snapshot_writer", None) is not None:
+            self.snapshot_writer.close(timeout=5)
+            self.snapshot_index.close()
+            self.snapshot_writer = None
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+    
     def __del__(self):
-        """Cleanup MSS resources"""
+        """Cleanup MSS, OCR and snapshot resources"""
         try:
-            if hasattr(self, 'sct'):
-                self.sct.close()
+            self.close()
         except:
             pass
 
-    def preprocess_for_ocr(self, image: np.ndarray) -> np.ndarray:
+    def preprocess_for_ocr(self, image: np.ndarray, profile: Optional[str] = None) -> np.ndarray:
         """
         Preprocess image to improve OCR accuracy
+        Args:
+            image: BGR or grayscale image
+            profile: One of PREPROCESS_PROFILES, defaults to analysis.preprocess_profile
         """
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Apply adaptive thresholding to handle different lighting conditions
-            binary = cv2.adaptiveThreshold(
-                gray, 
-                255, 
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 
-                11, 
-                2
-            )
-            
-            # Denoise to remove small artifacts
-            denoised = cv2.fastNlMeansDenoising(binary)
-            
-            # Enhance contrast
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(denoised)
-            
-            return enhanced
-            
+            return PREPROCESS_PROFILES[profile or self._preprocess_profile()](image)
         except Exception as e:
             self.logger.error(f"Image preprocessing failed: {str(e)}")
             raise
     
-    def _ensure_ocr_reader(self):
-        """Initialize the OCR reader if not already initialized"""
-        if self.reader is None:
+    def _preprocess_profile(self, target: Optional[CaptureTarget] = None) -> str:
+        """The configured preprocessing profile, validated"""
+        if target is None:
+            profile = self._setting("preprocess_profile", DEFAULT_PROFILE)
+        else:
+            profile = self._target_setting(target, "preprocess_profile", DEFAULT_PROFILE)
+        if profile not in PREPROCESS_PROFILES:
+            self.logger.warning(f"Unknown preprocessing profile '{profile}', using '{DEFAULT_PROFILE}'")
+            return DEFAULT_PROFILE
+        return profile
+    
+    def benchmark_preprocessing(self, repeats: int = 3) -> Dict[str, Dict[str, Any]]:
+        """
+        Benchmark every preprocessing profile on the last screenshot,
+        reporting latency against OCR confidence
+        """
+        if self.last_gray is None:
+            raise RuntimeError("No screenshot available for benchmarking")
+        
+        self._ensure_ocr_pool()
+        image = self.last_gray
+        future = self.ocr_pool.submit(lambda reader: benchmark_profiles(image, reader.readtext, repeats))
+        report = self.ocr_pool.gather([future])[0]
+        if report is None:
+            raise TimeoutError("Preprocessing benchmark timed out")
+        
+        for name, stats in report.items():
+            self.logger.info(
+                f"Profile '{name}': preprocess {stats['preprocess_latency'] * 1000:.1f} ms, "
+                f"OCR {stats['ocr_latency']:.2f} s, {stats['confidence']:.2%} confidence, "
+                f"{stats['boxes']} boxes"
+            )
+        return report
+    
+    def warm_up(self, progress: Optional[Callable[[str, float], None]] = None) -> threading.Thread:
+        """Load one shared OCR reader per worker in the background"""
+        cache = OCRReaderCache.get_instance()
+        if progress is not None:
+            def listener(message: str, fraction: float):
+                progress(message, fraction)
+                if fraction >= 1.0:
+                    cache.remove_listener(listener)
+            cache.add_listener(listener)
+        return cache.warm_up(
+            list(self._setting("ocr_languages", ['en'])),
+            bool(self._setting("gpu", False)),
+            max(1, int(self._setting("threads", 4)))
+        )
+    
+    def _ensure_ocr_pool(self):
+        """Start the OCR worker pool, restarting it if its analysis settings changed"""
+        threads = max(1, int(self._setting("threads", 4)))
+        languages = list(self._setting("ocr_languages", ['en']))
+        gpu = bool(self._setting("gpu", False))
+        if self.ocr_pool is not None and (self.ocr_pool.threads, self.ocr_pool.languages, self.ocr_pool.gpu) != (threads, languages, gpu):
+            self.ocr_pool.shutdown()
+            self.ocr_pool = None
+        
+        if self.ocr_pool is None:
             try:
-                self.logger.info("Initializing EasyOCR reader...")
-                self.reader = easyocr.Reader(['en'])
-                self.logger.info("EasyOCR reader initialized successfully")
+                self.ocr_pool = OCRWorkerPool(threads, self._setting("timeout", 300), languages, gpu)
             except Exception as e:
-                self.logger.error(f"Failed to initialize OCR reader: {str(e)}")
+                self.logger.error(f"Failed to start OCR worker pool: {str(e)}")
                 raise
+        
+        self.ocr_pool.timeout = self._setting("timeout", 300)
     
     def get_screen_text(self) -> Tuple[str, float]:
         """
-        Extract text from the last captured screenshot
+        Extract text from the last capture of every target
         Returns:
             Tuple of (extracted_text, confidence_score)
         """
-        if self.last_screenshot is None:
+        result = self.read_screen()
+        return result.text, result.confidence
+    
+    def read_screen(self, cancel: Optional[threading.Event] = None) -> OCRResult:
+        """
+        Run OCR on the last capture of every target, keeping per-box layout
+        
+        Only the tiles that changed since the previous OCR pass are
+        re-recognized; their results are spliced into each target's cached
+        tile map. Dirty regions of all targets are recognized in one batch.
+        Args:
+            cancel: Event that abandons the pass once set; regions not yet
+                recognized stay dirty for the next pass
+        Returns:
+            OCRResult with boxes in virtual screen coordinates, empty if cancelled
+        """
+        targets = [target for target in self.targets
+                   if target.last_gray is not None and target.bounds is not None]
+        if not targets:
             self.logger.warning("No screenshot available for text extraction")
-            return "", 0.0
+            return OCRResult()
         
         try:
-            self._ensure_ocr_reader()
+            self._ensure_ocr_pool()
             
-            # Preprocess image for better OCR
-            processed_image = self.preprocess_for_ocr(self.last_screenshot)
+            # Collect the changed regions of every target. Regions are padded
+            # so words straddling the border are read whole
+            jobs = []
+            for target in targets:
+                regions = target.dirty_regions(
+                    int(self._target_setting(target, "tile_size", 256)),
+                    self._target_setting(target, "tile_diff_threshold", 32),
+                    self._target_setting(target, "full_pass_ratio", 0.5)
+                )
+                margin = int(self._target_setting(target, "tile_margin", 16))
+                profile = self._preprocess_profile(target)
+                for region in regions:
+                    jobs.append((target, region, target.region_bounds(region, margin), profile))
             
-            # Perform OCR with confidence scores
+            # Perform OCR on the changed regions only
             start_time = time.time()
-            results = self.reader.readtext(processed_image)
+            crops = [target.last_gray[y0:y1, x0:x1] for target, _, (x0, y0, x1, y1), _ in jobs]
+            results = self.recognize_crops(crops, [profile for *_, profile in jobs], cancel)
+            
+            reusable = {target.name: True for target in targets}
+            for (target, region, (x0, y0, _, _), _), region_results in zip(jobs, results):
+                if region_results is None:
+                    reusable[target.name] = target.invalidate_region(region) and reusable[target.name]
+                else:
+                    target.splice_region(region, (x0, y0), region_results)
             duration = time.time() - start_time
             
-            # Extract text and calculate average confidence
-            if results:
-                texts = []
-                total_confidence = 0.0
-                
-                for bbox, text, confidence in results:
-                    texts.append(text)
-                    total_confidence += confidence
-                
-                extracted_text = ' '.join(texts)
-                avg_confidence = total_confidence / len(results)
-                
+            cancelled = cancel is not None and cancel.is_set()
+            for target in targets:
+                target.finish_pass(reusable[target.name])
+                if cancelled:
+                    # Force the next pass even if the screen stays the same
+                    target.last_ocr_signature = None
+            
+            if cancelled:
+                self.logger.info("Text extraction cancelled")
+                return OCRResult()
+            
+            if jobs:
+                pixels = sum((x1 - x0) * (y1 - y0) for _, _, (x0, y0, x1, y1), _ in jobs)
+                self.logger.debug(f"OCR ran on {len(jobs)} dirty regions ({pixels} px)")
+            
+            # Merge the cached tiles of every target into one screen-wide result
+            parts = []
+            for target in targets:
+                target.last_result = target.tile_result()
+                parts.append(target.last_result.translate(target.bounds["left"], target.bounds["top"]))
+            result = OCRResult.concat(parts)
+            
+            if len(result):
                 self.logger.info(
                     f"Text extraction completed in {duration:.2f} seconds "
-                    f"with {avg_confidence:.2%} confidence"
+                    f"with {result.confidence:.2%} confidence"
                 )
-                self.logger.debug(f"Extracted text: {extracted_text[:100]}...")
-                
-                return extracted_text, avg_confidence
+                self.logger.debug(f"Extracted text: {result.text[:100]}...")
             
-            return "", 0.0
+            self.last_result = result
+            return result
             
         except Exception as e:
             self.logger.error(f"Text extraction failed: {str(e)}")
             raise
-
+    
+    def recognize_crops(self, crops: List[np.ndarray], profiles: Optional[List[str]] = None,
+                        cancel: Optional[threading.Event] = None) -> List[Optional[OCRResult]]:
+        """
+        Batched OCR of several image crops (tiles, monitors or queued frames)
+        
+        Crops seen before are answered from the content-hash cache. The rest
+        are preprocessed in parallel on the worker pool, then packed onto
+        shared canvases so detection runs once per canvas and recognition
+        runs in batches of analysis.batch_size text regions.
+        Args:
+            crops: Grayscale or BGR crops
+            profiles: Preprocessing profile per crop, defaults to the configured one
+            cancel: Event that abandons outstanding jobs once set
+        Returns:
+            OCRResult per crop in crop coordinates, None where the job timed
+            out or was cancelled
+        """
+        if not crops:
+            return []
+        
+        if profiles is None:
+            profiles = [self._preprocess_profile()] * len(crops)
+        languages = tuple(self._setting("ocr_languages", ['en']))
+        keys = [OCRResultCache.make_key(crop, profile, languages) for crop, profile in zip(crops, profiles)]
+        
+        results: List[Optional[OCRResult]] = [self.ocr_cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            self.logger.debug(f"All {len(crops)} crops answered from the OCR cache")
+            return results
+        
+        self._ensure_ocr_pool()
+        
+        futures = [
+            self.ocr_pool.submit(
+                lambda reader, crop=crops[i], profile=profiles[i]: self.preprocess_for_ocr(crop, profile),
+                needs_reader=False
+            )
+            for i in pending
+        ]
+        processed = self.ocr_pool.gather(futures, cancel=cancel)
+        if cancel is not None and cancel.is_set():
+            return results
+        ready = [pending[i] for i, image in enumerate(processed) if image is not None]
+        processed = [image for image in processed if image is not None]
+        
+        packed = pack_crops(
+            processed,
+            canvas_size=int(self._setting("batch_canvas_size", 2560)),
+            padding=int(self._setting("batch_padding", 32))
+        )
+        batch_size = int(self._setting("batch_size", 16))
+        futures = [
+            self.ocr_pool.submit(lambda reader, canvas=canvas: reader.readtext(canvas, batch_size=batch_size))
+            for canvas, _ in packed
+        ]
+        
+        for (_, placements), canvas_results in zip(packed, self.ocr_pool.gather(futures, cancel=cancel)):
+            if canvas_results is None:
+                continue
+            for index, crop_results in unpack_results(canvas_results, placements).items():
+                result = results[ready[index]] = OCRResult.from_readtext(crop_results)
+                self.ocr_cache.put(keys[ready[index]], result)
+        
+        self.logger.debug(
+            f"Recognized {len(pending)} of {len(crops)} crops in {len(packed)} batched reader calls, "
+            f"{len(crops) - len(pending)} from the OCR cache"
+        )
+        return results
+    
 class ConfigManager:
     def __init__(self):
         self.config_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config")
@@ -236,11 +806,42 @@ class ConfigManager:
             return default 
 
 class IntegrityCore:
-    def __init__(self):
+    # Snapshots and history entries kept waiting for their counterpart
+    MAX_PENDING_LINKS = 16
+    # History entries recorded between retention passes
+    HISTORY_EXPIRE_INTERVAL = 200
+    
+    def __init__(self, config=None):
+        self.config = config
         self.config_dir = os.path.join(os.path.expanduser('~'), 'IntegrityAssistant', 'config')
         os.makedirs(self.config_dir, exist_ok=True)
         self.setup_logging()
-        self.screen_analyzer = ScreenAnalyzer()
+        
+        # Searchable history of every OCR result
+        self.history = OCRHistory(os.path.join(os.path.expanduser('~'), 'IntegrityAssistant', 'history.db'))
+        max_age_days = config.get("analysis.history_max_age_days", 30) if config else 30
+        self._history_max_age = max_age_days * 86400
+        self._records_since_expire = 0
+        self.expire_history()
+        
+        # History entries link to the snapshot of their own frame. The writer
+        # may finish before or after the entry is recorded, so whichever side
+        # comes first waits here for the other.
+        self._snapshot_lock = threading.Lock()
+        self._pending_links: "OrderedDict[datetime, int]" = OrderedDict()
+        self._saved_snapshots: "OrderedDict[datetime, str]" = OrderedDict()
+        
+        self.screen_analyzer = ScreenAnalyzer(
+            config,
+            on_snapshot_saved=self._on_snapshot_saved,
+            on_snapshots_removed=self.history.unlink_snapshots
+        )
+        
+        # Serializes manual analyses with the continuous monitoring loop
+        self._analysis_lock = threading.Lock()
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._monitor_stop = threading.Event()
+        self.scheduler: Optional[AdaptiveScheduler] = None
         
     def setup_logging(self):
         """Set up logging configuration"""
@@ -261,26 +862,86 @@ class IntegrityCore:
         self.logger = logging.getLogger("IntegrityCore")
         self.logger.info("Logging initialized")
     
-    def analyze_screen(self) -> Dict[str, Any]:
-        """Analyze current screen content"""
-        self.logger.info("Starting screen analysis")
+    def analyze_screen(self, skip_unchanged: bool = False,
+                       progress: Optional[Callable[[str, float], None]] = None,
+                       cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Analyze current screen content
+        Args:
+            skip_unchanged: Reuse the previous OCR result when the screen has
+                not changed since it was produced
+            progress: Called with (message, fraction) as the analysis advances
+            cancel: Event that stops the analysis at the next checkpoint
+        Returns:
+            Dict with status ("success", "cancelled" or "error") and message;
+            on success also "result", the OCRResult with per-box layout, plus
+            its flattened "text" and "confidence"
+        """
+        with self._analysis_lock:
+            return self._analyze_screen(skip_unchanged, progress, cancel)
+    
+    def _analyze_screen(self, skip_unchanged: bool, progress: Optional[Callable[[str, float], None]],
+                        cancel: Optional[threading.Event]) -> Dict[str, Any]:
+        self.logger.debug("Starting screen analysis")
         start_time = time.time()
+        report = progress or (lambda message, fraction: None)
+        cancelled = {
+            "status": "cancelled",
+            "message": "Analysis cancelled",
+            "timestamp": time.time()
+        }
         
         try:
             # Capture and process screen
+            report("Capturing screen...", 0.0)
             self.screen_analyzer.capture_screen()
+            if cancel is not None and cancel.is_set():
+                return cancelled
+            
+            if skip_unchanged and not self.screen_analyzer.has_changed():
+                result = self.screen_analyzer.last_result
+                return {
+                    "status": "success",
+                    "message": "Screen unchanged",
+                    "unchanged": True,
+                    "result": result,
+                    "text": result.text,
+                    "confidence": result.confidence,
+                    "timestamp": time.time(),
+                    "duration": time.time() - start_time
+                }
+            
+            # Extract text with per-box layout and confidence
+            report("Recognizing text...", 0.1)
+            result = self.screen_analyzer.read_screen(cancel)
+            if cancel is not None and cancel.is_set():
+                return cancelled
             
-            # Extract text with confidence score
-            text, confidence = self.screen_analyzer.get_screen_text()
+            report("Saving results...", 0.9)
+            try:
+                entry_id = self.history.record(result.text, result.confidence, result.to_dict())
+                snapshot_time = self.screen_analyzer.last_capture_snapshot
+                if entry_id is not None and snapshot_time is not None:
+                    self._link_snapshot(entry_id, snapshot_time)
+                if entry_id is not None:
+                    # Monitoring records continuously, so retention runs as it goes
+                    self._records_since_expire += 1
+                    if self._records_since_expire >= self.HISTORY_EXPIRE_INTERVAL:
+                        self.expire_history()
+            except Exception as e:
+                self.logger.error(f"Failed to record OCR history: {str(e)}")
             
             duration = time.time() - start_time
             self.logger.info(f"Screen analysis completed in {duration:.2f} seconds")
+            report("Analysis complete", 1.0)
             
             return {
                 "status": "success",
                 "message": "Screen analysis completed",
-                "text": text,
-                "confidence": confidence,
+                "unchanged": False,
+                "result": result,
+                "text": result.text,
+                "confidence": result.confidence,
                 "timestamp": time.time(),
                 "duration": duration
             }
@@ -293,6 +954,128 @@ class IntegrityCore:
                 "timestamp": time.time()
             }
     
+    def expire_history(self):
+        """Delete history entries older than analysis.history_max_age_days"""
+        self._records_since_expire = 0
+        try:
+            removed = self.history.expire(self._history_max_age)
+            if removed:
+                self.logger.debug(f"Removed {removed} old history entries")
+        except Exception as e:
+            self.logger.error(f"Failed to expire OCR history: {str(e)}")
+    
+    def _link_snapshot(self, entry_id: int, snapshot_time: datetime):
+        """Link a history entry to the snapshot queued for its frame, now or once it is written"""
+        with self._snapshot_lock:
+            filename = self._saved_snapshots.pop(snapshot_time, None)
+            if filename is None:
+                self._pending_links[snapshot_time] = entry_id
+                # Snapshots dropped by a full queue never arrive
+                while len(self._pending_links) > self.MAX_PENDING_LINKS:
+                    self._pending_links.popitem(last=False)
+        if filename is not None:
+            self.history.link_snapshot(entry_id, filename)
+    
+    def _on_snapshot_saved(self, filename: str, snapshot_time: datetime):
+        with self._snapshot_lock:
+            entry_id = self._pending_links.pop(snapshot_time, None)
+            if entry_id is None:
+                self._saved_snapshots[snapshot_time] = filename
+                # Frames whose analysis was cancelled or failed are never recorded
+                while len(self._saved_snapshots) > self.MAX_PENDING_LINKS:
+                    self._saved_snapshots.popitem(last=False)
+        if entry_id is not None:
+            self.history.link_snapshot(entry_id, filename)
+    
+    def start_monitoring(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         interval: Optional[float] = None):
+        """
+        Continuously capture the screen in a background thread, running OCR
+        only when the screen has changed. The capture rate adapts to screen
+        activity within the analysis.monitor_* interval bounds and CPU budget.
+        Args:
+            callback: Called from the monitoring thread with each new result
+            interval: Initial seconds between captures, defaults to analysis.capture_interval
+        """
+        if self._monitor_thread is not None and self._monitor_thread.is_alive():
+            self.logger.warning("Screen monitoring is already running")
+            return
+        
+        config = self.config
+        if interval is None:
+            interval = config.get("analysis.capture_interval", 2.0) if config else 2.0
+        self.scheduler = AdaptiveScheduler(
+            min_interval=config.get("analysis.monitor_min_interval", 0.5) if config else 0.5,
+            max_interval=config.get("analysis.monitor_max_interval", 10.0) if config else 10.0,
+            cpu_budget=config.get("analysis.monitor_cpu_budget", 10.0) if config else 10.0,
+            backoff=config.get("analysis.monitor_backoff", 1.5) if config else 1.5,
+            initial_interval=interval
+        )
+        
+        self._monitor_stop.clear()
+        self._monitor_thread = threading.Thread(
+            target=self._monitor_loop,
+            args=(callback, self.scheduler),
+            name="IntegrityMonitor",
+            daemon=True
+        )
+        self._monitor_thread.start()
+        self.logger.info(f"Screen monitoring started (interval {interval:.2f}s)")
+    
+    def stop_monitoring(self, timeout: Optional[float] = None):
+        """Stop the continuous monitoring thread"""
+        self._monitor_stop.set()
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout)
+            self._monitor_thread = None
+            self.logger.info("Screen monitoring stopped")
+    
+    def is_monitoring(self) -> bool:
+        return self._monitor_thread is not None and self._monitor_thread.is_alive()
+    
+    def _monitor_loop(self, callback: Optional[Callable[[Dict[str, Any]], None]], scheduler: AdaptiveScheduler):
+        skipped = 0
+        while not self._monitor_stop.is_set():
+            scheduler.begin()
+            result = self.analyze_screen(skip_unchanged=True)
+            changed = result.get("status") == "success" and not result.get("unchanged")
+            delay = scheduler.end(changed)
+            
+            if result.get("unchanged"):
+                skipped += 1
+            else:
+                if skipped:
+                    self.logger.debug(
+                        f"Skipped OCR on {skipped} unchanged frames, "
+                        f"next capture in {delay:.2f}s (CPU {scheduler.cpu_load:.1%})"
+                    )
+                skipped = 0
+                if callback is not None:
+                    try:
+                        callback(result)
+                    except Exception as e:
+                        self.logger.error(f"Monitoring callback failed: {str(e)}", exc_info=True)
+            
+            self._monitor_stop.wait(delay)
+    
+    def warm_up_ocr(self, progress: Optional[Callable[[str, float], None]] = None) -> threading.Thread:
+        """
+        Start loading the OCR readers in the background so the first analysis is fast
+        Args:
+            progress: Called from the loading thread with (message, fraction)
+        """
+        return self.screen_analyzer.warm_up(progress)
+    
+    def search_history(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over past OCR results, best matches first"""
+        return self.history.search(query, limit)
+    
+    def shutdown(self):
+        """Stop monitoring and release capture, OCR, snapshot and history resources"""
+        self.stop_monitoring(timeout=5)
+        self.screen_analyzer.close()
+        self.history.close()
+    
     def get_version(self) -> str:
         """Get current version of Integrity Assistant"""
         return "2.0.0" 
\ No newline at end of file
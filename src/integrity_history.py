@@ -0,0 +1,152 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+class OCRHistory:
+    """
+    Local full-text index of every OCR result, so screen history can be
+    searched without re-running OCR on archived snapshots.
+
+    Each analysis is stored with its timestamp, confidence, per-box
+    layout (OCRResult.to_dict()) and, if its frame was archived, the
+    snapshot filename. The link is cleared when snapshot retention deletes
+    the file. Text goes into an SQLite FTS5 table; where SQLite was built without
+    FTS5, search falls back to a LIKE scan.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = logging.getLogger("IntegrityCore.OCRHistory")
+        self._lock = threading.Lock()
+        self._last_text: Optional[str] = None
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                confidence REAL NOT NULL,
+                snapshot TEXT,
+                boxes TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses(timestamp);
+            CREATE INDEX IF NOT EXISTS idx_analyses_snapshot ON analyses(snapshot);
+        """)
+
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS analyses_text USING fts5(text)")
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.logger.warning("SQLite has no FTS5 support, history search will be slower")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS analyses_text (rowid INTEGER PRIMARY KEY, text TEXT)")
+            self.full_text = False
+        self._conn.commit()
+
+    def record(self, text: str, confidence: float, boxes: Dict[str, Any],
+               snapshot: Optional[str] = None, timestamp: Optional[float] = None) -> Optional[int]:
+        """
+        Store one analysis result. Consecutive identical texts are stored once.
+        Returns:
+            The new entry id, or None if it was skipped
+        """
+        if not text or text == self._last_text:
+            return None
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO analyses (timestamp, confidence, snapshot, boxes) VALUES (?, ?, ?, ?)",
+                (timestamp or time.time(), confidence, snapshot, json.dumps(boxes, separators=(",", ":")))
+            )
+            entry_id = cursor.lastrowid
+            self._conn.execute("INSERT INTO analyses_text (rowid, text) VALUES (?, ?)", (entry_id, text))
+
+        self._last_text = text
+        return entry_id
+
+    def link_snapshot(self, entry_id: int, snapshot: str):
+        """Attach the snapshot written for an entry's frame once the writer has saved it"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE analyses SET snapshot = ? WHERE id = ?", (snapshot, entry_id))
+
+    def unlink_snapshots(self, snapshots: List[str]):
+        """Clear links to snapshots that retention has deleted"""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE analyses SET snapshot = NULL WHERE snapshot = ?",
+                                   [(snapshot,) for snapshot in snapshots])
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        """Quote every term so user input is never parsed as FTS5 syntax"""
+        return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+    def search(self, query: str, limit: int = 20, since: Optional[float] = None,
+               until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Find analyses containing every term of query, best matches first
+        Returns:
+            Dicts with id, timestamp, confidence, snapshot and a text snippet
+        """
+        if not query.strip():
+            return []
+
+        bounds = (since if since is not None else 0, until if until is not None else float("inf"))
+        with self._lock:
+            if self.full_text:
+                rows = self._conn.execute(
+                    "SELECT a.id, a.timestamp, a.confidence, a.snapshot, "
+                    "snippet(analyses_text, 0, '[', ']', '...', 12) "
+                    "FROM analyses_text JOIN analyses AS a ON a.id = analyses_text.rowid "
+                    "WHERE analyses_text MATCH ? AND a.timestamp >= ? AND a.timestamp <= ? "
+                    "ORDER BY rank LIMIT ?",
+                    (self._match_expression(query),) + bounds + (limit,)
+                ).fetchall()
+            else:
+                conditions = " AND ".join("t.text LIKE ?" for _ in query.split())
+                rows = self._conn.execute(
+                    "SELECT a.id, a.timestamp, a.confidence, a.snapshot, substr(t.text, 1, 200) "
+                    "FROM analyses_text AS t JOIN analyses AS a ON a.id = t.rowid "
+                    f"WHERE {conditions} AND a.timestamp >= ? AND a.timestamp <= ? "
+                    "ORDER BY a.timestamp DESC LIMIT ?",
+                    tuple(f"%{term}%" for term in query.split()) + bounds + (limit,)
+                ).fetchall()
+
+        return [
+            {"id": row[0], "timestamp": row[1], "confidence": row[2], "snapshot": row[3], "snippet": row[4]}
+            for row in rows
+        ]
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Full entry including text and per-box coordinates"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT a.id, a.timestamp, a.confidence, a.snapshot, a.boxes, t.text "
+                "FROM analyses AS a JOIN analyses_text AS t ON t.rowid = a.id WHERE a.id = ?",
+                (entry_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0], "timestamp": row[1], "confidence": row[2],
+            "snapshot": row[3], "boxes": json.loads(row[4]), "text": row[5]
+        }
+
+    def expire(self, max_age: float) -> int:
+        """
+        Delete entries older than max_age seconds
+        Returns:
+            Number of entries removed
+        """
+        with self._lock, self._conn:
+            ids = [(row[0],) for row in self._conn.execute(
+                "SELECT id FROM analyses WHERE timestamp < ?", (time.time() - max_age,)
+            )]
+            self._conn.executemany("DELETE FROM analyses_text WHERE rowid = ?", ids)
+            self._conn.executemany("DELETE FROM analyses WHERE id = ?", ids)
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+import aiohttp
+
+class AsyncHTTPClient:
+    """
+    Non-blocking HTTP transport for the Railway API.
+
+    One aiohttp session keeps a pool of keep-alive connections to base_url,
+    so consecutive requests skip the TCP and TLS handshakes. Requests run
+    concurrently up to max_concurrency; more wait for a free slot instead of
+    opening ever more connections.
+
+    aiohttp sessions belong to the event loop they were created on. The
+    session is created lazily on first use, and a new one is opened if the
+    client is later awaited from a different loop.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 300, max_connections: int = 8,
+                 max_concurrency: int = 4, connect_timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max(1, int(max_connections))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.headers: Dict[str, str] = {}
+        self.logger = logging.getLogger("IntegrityCore.AsyncHTTPClient")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                self.logger.warning("HTTP client used from a new event loop, opening a new connection pool")
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=min(self.connect_timeout, self.timeout))
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def request(self, method: str, path: str, **kwargs) -> Any:
+        """
+        Send a request relative to base_url
+        Returns:
+            Decoded JSON body, or the text body for non-JSON responses
+        Raises:
+            aiohttp.ClientResponseError for error statuses
+        """
+        session = self._get_session()
+        headers = dict(self.headers)
+        headers.update(kwargs.pop("headers", None) or {})
+
+        async with self._semaphore:
+            async with session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs) as response:
+                response.raise_for_status()
+                if response.content_type == "application/json":
+                    return await response.json()
+                return await response.text()
+
+    async def post_json(self, path: str, data: Any, **kwargs) -> Any:
+        return await self.request("POST", path, json=data, **kwargs)
+
+    async def post_file(self, path: str, field: str, filename: str, data: bytes,
+                        content_type: str = "application/octet-stream",
+                        fields: Optional[Dict[str, str]] = None, **kwargs) -> Any:
+        """Upload data as a multipart/form-data file field, plus optional text fields"""
+        form = aiohttp.FormData()
+        for name, value in (fields or {}).items():
+            form.add_field(name, value)
+        form.add_field(field, data, filename=filename, content_type=content_type)
+        return await self.request("POST", path, data=form, **kwargs)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
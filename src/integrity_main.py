@@ -1,7 +1,11 @@
 import os
 import sys
 import json
+import time
+import queue
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 import customtkinter as ctk
 from integrity_logger import IntegrityLogger
 from integrity_config import ConfigManager
@@ -11,13 +15,43 @@ class IntegrityAssistant:
     def __init__(self):
         self.logger = IntegrityLogger.get_logger()
         self.config = ConfigManager.get_instance()
-        self.core = IntegrityCore()
+        self.core = IntegrityCore(self.config)
+        
+        # Analyses and monitoring run off the Tk thread; their progress and
+        # results come back through a queue drained by window.after
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="IntegrityAnalysis")
+        self._ui_queue: "queue.Queue" = queue.Queue()
+        self._polling = False
+        self._analysis_future = None
+        self._analysis_cancel = threading.Event()
+        self._monitoring = False
         
         # Set up exception handler
         sys.excepthook = self.handle_exception
         
         # Initialize UI
         self.setup_ui()
+        
+        # Load OCR models in the background so the first analysis is fast
+        self._ocr_progress = None
+        self.core.warm_up_ocr(self._on_ocr_progress)
+        self.window.after(250, self._poll_ocr_progress)
+    
+    def _on_ocr_progress(self, message: str, fraction: float):
+        """Record OCR load progress; called from the loading thread"""
+        self._ocr_progress = (message, fraction)
+    
+    def _poll_ocr_progress(self):
+        """Show OCR load progress in the status bar until the models are ready"""
+        progress = self._ocr_progress
+        if progress is not None:
+            message, fraction = progress
+            # Analysis and monitoring status take precedence
+            if self._analysis_future is None and not self._monitoring:
+                self.status.configure(text=message)
+            if fraction >= 1.0:
+                return
+        self.window.after(250, self._poll_ocr_progress)
     
     def handle_exception(self, exc_type, exc_value, exc_traceback):
         """Handle uncaught exceptions"""
@@ -76,12 +110,26 @@ class IntegrityAssistant:
             btn_frame = ctk.CTkFrame(content)
             btn_frame.pack(pady=20)
             
-            analyze_btn = ctk.CTkButton(
+            self.analyze_btn = ctk.CTkButton(
                 btn_frame,
                 text="Start Analysis",
                 command=self.start_analysis
             )
-            analyze_btn.pack(side="left", padx=10)
+            self.analyze_btn.pack(side="left", padx=10)
+            
+            self.monitor_btn = ctk.CTkButton(
+                btn_frame,
+                text="Start Monitoring",
+                command=self.toggle_monitoring
+            )
+            self.monitor_btn.pack(side="left", padx=10)
+            
+            history_btn = ctk.CTkButton(
+                btn_frame,
+                text="Search History",
+                command=self.open_history_search
+            )
+            history_btn.pack(side="left", padx=10)
             
             settings_btn = ctk.CTkButton(
                 btn_frame,
@@ -105,25 +153,132 @@ class IntegrityAssistant:
             raise
     
     def start_analysis(self):
-        """Start the analysis process"""
+        """Start the analysis process in the background, or cancel the running one"""
+        if self._analysis_future is not None:
+            self.cancel_analysis()
+            return
+        
         try:
             self.status.configure(text="Analysis in progress...")
-            self.window.update()
+            self.analyze_btn.configure(text="Cancel Analysis")
+            self._analysis_cancel.clear()
+            
+            # Use the core to analyze screen on the executor thread
+            self._analysis_future = self.executor.submit(
+                self.core.analyze_screen,
+                progress=lambda message, fraction: self._ui_queue.put(("progress", message, fraction)),
+                cancel=self._analysis_cancel
+            )
+            self._analysis_future.add_done_callback(lambda future: self._ui_queue.put(("done", future)))
+            self._ensure_polling()
             
-            # Use the core to analyze screen
-            result = self.core.analyze_screen()
+        except Exception as e:
+            self.logger.error("Analysis failed", exc_info=True)
+            self._finish_analysis()
+            self.show_message(f"Analysis failed: {str(e)}", "error")
+    
+    def cancel_analysis(self):
+        """Ask the running analysis to stop at its next checkpoint"""
+        if self._analysis_future is not None:
+            self._analysis_cancel.set()
+            self.status.configure(text="Cancelling analysis...")
+    
+    def toggle_monitoring(self):
+        """Start continuous screen monitoring, or stop it if it is running"""
+        if self._monitoring:
+            self.stop_monitoring()
+            return
+        
+        try:
+            self.core.start_monitoring(callback=lambda result: self._ui_queue.put(("monitor", result)))
+            self._monitoring = True
+            self.monitor_btn.configure(text="Stop Monitoring")
+            if self._analysis_future is None:
+                self.status.configure(text="Monitoring screen...")
+            self._ensure_polling()
+        except Exception as e:
+            self.logger.error("Failed to start monitoring", exc_info=True)
+            self.show_message(f"Failed to start monitoring: {str(e)}", "error")
+    
+    def stop_monitoring(self):
+        """Stop monitoring without blocking the UI on the pass in progress"""
+        self.monitor_btn.configure(text="Stopping...", state="disabled")
+        
+        def stop():
+            self.core.stop_monitoring()
+            self._ui_queue.put(("monitor_stopped",))
+        
+        threading.Thread(target=stop, name="IntegrityMonitorStop", daemon=True).start()
+    
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.window.after(16, self._poll_ui_queue)
+    
+    def _poll_ui_queue(self):
+        """
+        Apply analysis progress and results on the Tk thread, about 60 times
+        a second while an analysis or monitoring is running
+        """
+        try:
+            while True:
+                event = self._ui_queue.get_nowait()
+                if event[0] == "progress":
+                    _, message, fraction = event
+                    if not self._analysis_cancel.is_set():
+                        self.status.configure(text=f"{message} ({fraction:.0%})")
+                elif event[0] == "done":
+                    self._on_analysis_done(event[1])
+                elif event[0] == "monitor":
+                    self._on_monitor_result(event[1])
+                elif event[0] == "monitor_stopped":
+                    self._on_monitoring_stopped()
+        except queue.Empty:
+            pass
+        
+        if self._analysis_future is not None or self._monitoring:
+            self.window.after(16, self._poll_ui_queue)
+        else:
+            self._polling = False
+    
+    def _on_monitor_result(self, result):
+        if not self._monitoring or self._analysis_future is not None:
+            return
+        if result["status"] == "success":
+            self.status.configure(
+                text=f"Monitoring: screen updated at {time.strftime('%H:%M:%S')} "
+                     f"(confidence {result['confidence']:.1%})"
+            )
+        elif result["status"] == "error":
+            self.status.configure(text=f"Monitoring: analysis failed: {result['message']}")
+    
+    def _on_monitoring_stopped(self):
+        self._monitoring = False
+        self.monitor_btn.configure(text="Start Monitoring", state="normal")
+        if self._analysis_future is None:
+            self.status.configure(text="Ready")
+    
+    def _on_analysis_done(self, future):
+        self._finish_analysis()
+        try:
+            result = future.result()
             
             if result["status"] == "success":
                 message = f"Analysis completed successfully!\nConfidence: {result['confidence']:.1%}"
                 self.show_message(message, "success")
+            elif result["status"] == "cancelled":
+                self.logger.info("Analysis cancelled")
             else:
                 self.show_message(f"Analysis failed: {result['message']}", "error")
             
         except Exception as e:
             self.logger.error("Analysis failed", exc_info=True)
             self.show_message(f"Analysis failed: {str(e)}", "error")
-        finally:
-            self.status.configure(text="Ready")
+    
+    def _finish_analysis(self):
+        self._analysis_future = None
+        self.analyze_btn.configure(text="Start Analysis")
+        self.status.configure(text="Monitoring screen..." if self._monitoring else "Ready")
     
     def open_settings(self):
         """Open settings dialog"""
@@ -151,6 +306,53 @@ class IntegrityAssistant:
             self.logger.error("Failed to open settings", exc_info=True)
             self.show_message(f"Failed to open settings: {str(e)}", "error")
     
+    def open_history_search(self):
+        """Open a dialog for full-text search over past OCR results"""
+        try:
+            dialog = ctk.CTkToplevel(self.window)
+            dialog.title("Search History")
+            dialog.geometry("600x450")
+            dialog.transient(self.window)
+            
+            search_frame = ctk.CTkFrame(dialog)
+            search_frame.pack(fill="x", padx=10, pady=10)
+            
+            query_entry = ctk.CTkEntry(search_frame, placeholder_text="Search screen text...")
+            query_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+            
+            results_box = ctk.CTkTextbox(dialog, wrap="word")
+            results_box.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+            
+            def search(_event=None):
+                results_box.delete("1.0", "end")
+                query = query_entry.get().strip()
+                if not query:
+                    return
+                try:
+                    results = self.core.search_history(query, limit=50)
+                except Exception as e:
+                    self.logger.error(f"History search failed: {e}")
+                    results_box.insert("end", f"Search failed: {str(e)}")
+                    return
+                if not results:
+                    results_box.insert("end", "No matches")
+                for entry in results:
+                    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["timestamp"]))
+                    snapshot = entry["snapshot"] or "no snapshot"
+                    results_box.insert(
+                        "end",
+                        f"{when}  ({entry['confidence']:.0%}, {snapshot})\n{entry['snippet']}\n\n"
+                    )
+            
+            search_btn = ctk.CTkButton(search_frame, text="Search", width=80, command=search)
+            search_btn.pack(side="left")
+            query_entry.bind("<Return>", search)
+            query_entry.focus()
+            
+        except Exception as e:
+            self.logger.error("Failed to open history search", exc_info=True)
+            self.show_message(f"Failed to open history search: {str(e)}", "error")
+    
     def change_theme(self, theme: str):
         """Change the application theme"""
         try:
@@ -189,6 +391,12 @@ class IntegrityAssistant:
         except Exception as e:
             self.logger.error("Application crashed", exc_info=True)
             raise
+        finally:
+            # Cancelled analyses return at their next checkpoint
+            self._analysis_cancel.set()
+            self.core.stop_monitoring(timeout=5)
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.core.shutdown()
 
 def main():
     logger = IntegrityLogger.get_logger()
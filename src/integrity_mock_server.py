@@ -0,0 +1,479 @@
+import sys
+import hmac
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import argparse
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+class MockState:
+    """
+    In-memory users, profiles, usage rows and analyses behind the mock
+    server, plus the fault injection settings. The random source is seeded
+    so latency jitter and injected errors repeat exactly between runs.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, token_lifetime: int = 3600, secret: str = "integrity-mock-secret"):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_lifetime = token_lifetime
+        self.secret = secret.encode("utf-8")
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"user_profiles": [], "usage_tracking": []}
+        self.analyses: List[Dict[str, Any]] = []
+        self.idempotent: Dict[str, Tuple[int, Any]] = {}
+        self.requests: Dict[str, int] = {}
+        self.injected_errors = 0
+        self.duplicates = 0
+
+    def add_user(self, email: str, password: str, questions_limit: int = 10, questions_used: int = 0) -> str:
+        user_id = str(uuid.uuid4())
+        with self.lock:
+            self.users[email] = {
+                "id": user_id, "email": email, "password": password,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            }
+            self.tables["user_profiles"].append({
+                "id": len(self.tables["user_profiles"]) + 1,
+                "user_id": user_id,
+                "username": email.split("@")[0],
+                "email": email,
+                "questions_limit": questions_limit,
+                "questions_used": questions_used,
+                "last_question_time": None
+            })
+        return user_id
+
+    def fault(self) -> Tuple[float, bool]:
+        """Draw the delay and whether to fail for one request"""
+        with self.lock:
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self.random.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        return delay, fail
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        """Encode claims as an HS256 JWT signed with the server secret"""
+        header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode("utf-8"))
+        payload = _b64url(json.dumps(claims).encode("utf-8"))
+        signature = _b64url(hmac.new(self.secret, f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest())
+        return f"{header}.{payload}.{signature}"
+
+    @property
+    def anon_key(self) -> str:
+        """Project API key for the client; like Supabase's, it is a JWT for the anon role"""
+        return self.sign({"iss": "integrity-mock", "role": "anon", "iat": 0, "exp": 2 ** 31 - 1})
+
+    def issue_session(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a signed HS256 access token and a refresh token for user"""
+        now = int(time.time())
+        expires_at = now + self.token_lifetime
+        access_token = self.sign({
+            "sub": user["id"], "email": user["email"], "role": "authenticated",
+            "iat": now, "exp": expires_at
+        })
+        refresh_token = uuid.uuid4().hex
+        with self.lock:
+            self.refresh_tokens[refresh_token] = user["email"]
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "expires_in": self.token_lifetime,
+            "expires_at": expires_at,
+            "refresh_token": refresh_token,
+            "user": self.public_user(user)
+        }
+
+    def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a valid, unexpired access token issued by this server"""
+        try:
+            header, payload, signature = token.split(".")
+            expected = hmac.new(self.secret, f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+            if not hmac.compare_digest(_b64url_decode(signature), expected):
+                return None
+            claims = json.loads(_b64url_decode(payload))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims
+
+    @staticmethod
+    def public_user(user: Dict[str, Any]) -> Dict[str, Any]:
+        """User object in the shape GoTrue returns, which the client validates"""
+        return {
+            "id": user["id"],
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": user["email"],
+            "email_confirmed_at": user["created_at"],
+            "confirmed_at": user["created_at"],
+            "last_sign_in_at": user["created_at"],
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": {},
+            "identities": [],
+            "created_at": user["created_at"],
+            "updated_at": user["created_at"]
+        }
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes the Railway endpoints (/analysis, /analyze) and the subset of
+    the Supabase auth (/auth/v1) and PostgREST (/rest/v1) APIs that
+    IntegrityAPI uses.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "IntegrityMock/1.0"
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logging.getLogger("IntegrityCore.MockServer").debug(format % args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        self.route = url.path.rstrip("/") or "/"
+        self.query = parse_qsl(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        with self.state.lock:
+            key = f"{method} {self.route}"
+            self.state.requests[key] = self.state.requests.get(key, 0) + 1
+
+        if self.route == "/__stats":
+            return self._send(200, self._stats())
+
+        delay, fail = self.state.fault()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return self._send(503, {"error": "injected failure"})
+
+        try:
+            if self.route == "/analysis" and method == "POST":
+                return self._idempotent(self._analysis)
+            if self.route == "/analyze" and method == "POST":
+                return self._idempotent(self._analyze)
+            if self.route.startswith("/auth/v1/"):
+                return self._auth(method, self.route[len("/auth/v1/"):])
+            if self.route.startswith("/rest/v1/"):
+                return self._rest(method, self.route[len("/rest/v1/"):])
+            self._send(404, {"error": f"No route for {method} {self.route}"})
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": f"Bad request: {e}"})
+
+    def _send(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self) -> Any:
+        return json.loads(self.body or b"{}")
+
+    def _claims(self) -> Optional[Dict[str, Any]]:
+        auth = self.headers.get("Authorization", "")
+        if not auth.lower().startswith("bearer "):
+            return None
+        return self.state.verify_token(auth[7:])
+
+    def _stats(self) -> Dict[str, Any]:
+        with self.state.lock:
+            return {
+                "requests": dict(self.state.requests),
+                "injected_errors": self.state.injected_errors,
+                "duplicates": self.state.duplicates,
+                "analyses": len(self.state.analyses),
+                "usage_rows": len(self.state.tables["usage_tracking"])
+            }
+
+    # Railway endpoints
+
+    def _idempotent(self, handler):
+        """Replay the stored response for a repeated Idempotency-Key"""
+        key = self.headers.get("Idempotency-Key")
+        if key:
+            with self.state.lock:
+                stored = self.state.idempotent.get(key)
+                if stored is not None:
+                    self.state.duplicates += 1
+            if stored is not None:
+                return self._send(*stored)
+
+        claims = self._claims()
+        if claims is None:
+            return self._send(401, {"error": "Invalid or expired token"})
+        status, body = handler(claims)
+        if key and status < 500:
+            with self.state.lock:
+                self.state.idempotent[key] = (status, body)
+        self._send(status, body)
+
+    def _analysis(self, claims: Dict[str, Any]) -> Tuple[int, Any]:
+        data = self._json()
+        with self.state.lock:
+            self.state.analyses.append({"user_id": claims["sub"], "kind": "analysis", "data": data})
+            analysis_id = len(self.state.analyses)
+        return 200, {"status": "success", "id": analysis_id, "answer": "Mock analysis result"}
+
+    def _analyze(self, claims: Dict[str, Any]) -> Tuple[int, Any]:
+        content_type = self.headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/form-data"):
+            return 400, {"error": "Expected multipart/form-data"}
+        with self.state.lock:
+            self.state.analyses.append({"user_id": claims["sub"], "kind": "screen", "bytes": len(self.body)})
+            analysis_id = len(self.state.analyses)
+        return 200, {"status": "success", "id": analysis_id, "bytes": len(self.body), "text": ""}
+
+    # Supabase auth
+
+    def _auth(self, method: str, path: str):
+        params = dict(self.query)
+        if path == "token" and method == "POST":
+            data = self._json()
+            if params.get("grant_type") == "password":
+                user = self.state.users.get(data.get("email"))
+                if user is None or user["password"] != data.get("password"):
+                    return self._send(400, {"error": "invalid_grant",
+                                            "error_description": "Invalid login credentials"})
+                return self._send(200, self.state.issue_session(user))
+            if params.get("grant_type") == "refresh_token":
+                with self.state.lock:
+                    email = self.state.refresh_tokens.pop(data.get("refresh_token"), None)
+                if email is None:
+                    return self._send(400, {"error": "invalid_grant",
+                                            "error_description": "Invalid refresh token"})
+                return self._send(200, self.state.issue_session(self.state.users[email]))
+            return self._send(400, {"error": "unsupported_grant_type"})
+
+        if path == "user" and method == "GET":
+            claims = self._claims()
+            if claims is None:
+                return self._send(401, {"error": "Invalid or expired token"})
+            user = self.state.users[claims["email"]]
+            return self._send(200, self.state.public_user(user))
+
+        if path == "logout" and method == "POST":
+            return self._send(204)
+
+        self._send(404, {"error": f"No auth route for {method} {path}"})
+
+    # Supabase PostgREST
+
+    def _filters(self) -> List[Tuple[str, str, str]]:
+        filters = []
+        for column, expression in self.query:
+            if column in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+                continue
+            operator, _, value = expression.partition(".")
+            filters.append((column, operator, value))
+        return filters
+
+    @staticmethod
+    def _matches(row: Dict[str, Any], filters: List[Tuple[str, str, str]]) -> bool:
+        for column, operator, value in filters:
+            actual = row.get(column)
+            if operator == "eq" and str(actual) != value:
+                return False
+            if operator == "neq" and str(actual) == value:
+                return False
+            if operator in ("gt", "gte", "lt", "lte"):
+                number = float(value)
+                if actual is None or not {
+                    "gt": actual > number, "gte": actual >= number,
+                    "lt": actual < number, "lte": actual <= number
+                }[operator]:
+                    return False
+        return True
+
+    def _rest(self, method: str, table: str):
+        claims = self._claims()
+        if claims is None:
+            return self._send(401, {"message": "JWT expired or missing"})
+        if table.startswith("rpc/") and method == "POST":
+            return self._rpc(claims, table[len("rpc/"):])
+        if table not in self.state.tables:
+            return self._send(404, {"message": f"relation {table} does not exist"})
+
+        rows = self.state.tables[table]
+        filters = self._filters()
+        representation = "return=representation" in self.headers.get("Prefer", "")
+        single = "vnd.pgrst.object" in self.headers.get("Accept", "")
+
+        with self.state.lock:
+            # Row-level security: users only see and change their own rows
+            visible = [row for row in rows if row.get("user_id") == claims["sub"] and self._matches(row, filters)]
+
+            if method == "GET":
+                result = [dict(row) for row in visible]
+            elif method == "POST":
+                data = self._json()
+                new_rows = data if isinstance(data, list) else [data]
+                if any(row.get("user_id") != claims["sub"] for row in new_rows):
+                    return self._send(403, {"message": "new row violates row-level security policy"})
+                result = []
+                for row in new_rows:
+                    row = dict(row, id=len(rows) + 1)
+                    row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+                    rows.append(row)
+                    result.append(dict(row))
+            elif method == "PATCH":
+                data = self._json()
+                now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                for row in visible:
+                    row.update({column: now if value == "now()" else value for column, value in data.items()})
+                result = [dict(row) for row in visible]
+            elif method == "DELETE":
+                for row in visible:
+                    rows.remove(row)
+                result = visible
+            else:
+                return self._send(405, {"message": f"{method} not allowed"})
+
+        status = 201 if method == "POST" else 200
+        if single:
+            if len(result) != 1:
+                return self._send(406, {"message": "JSON object requested, multiple (or no) rows returned"})
+            return self._send(status, result[0])
+        if method != "GET" and not representation:
+            return self._send(204 if method != "POST" else 201, None)
+        self._send(status, result)
+
+    def _rpc(self, claims: Dict[str, Any], name: str):
+        if name != "increment_questions_used":
+            return self._send(404, {"message": f"function {name} does not exist"})
+        amount = int(self._json().get("amount", 1))
+        if amount < 1:
+            return self._send(400, {"message": "amount must be positive"})
+        with self.state.lock:
+            for row in self.state.tables["user_profiles"]:
+                if row["user_id"] == claims["sub"]:
+                    # Charged up to the limit; questions past it are not counted
+                    row["questions_used"] = max(row["questions_used"],
+                                                min(row["questions_used"] + amount, row["questions_limit"]))
+                    row["last_question_time"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                    return self._send(200, dict(row))
+        self._send(400, {"code": "P0002", "message": "user profile not found"})
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is routine, not an error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockServer:
+    """
+    Local stand-in for the Railway API and the Supabase project, for
+    exercising IntegrityAPI without network access.
+
+    Point network.api_base_url and supabase_url at server.url and use
+    server.state.anon_key as supabase_key. latency and
+    jitter add a delay to every request and error_rate makes a fraction of
+    them fail with 503; with a seed the sequence is reproducible.
+    GET /__stats reports request counts, injected errors and replayed
+    idempotent requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None, token_lifetime: int = 3600):
+        self.state = MockState(latency, jitter, error_rate, seed, token_lifetime)
+        self.httpd = _QuietHTTPServer((host, port), MockRequestHandler)
+        self.httpd.state = self.state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="IntegrityMockServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Integrity Railway and Supabase endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random seconds added on top of latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible latency and errors")
+    parser.add_argument("--token-lifetime", type=int, default=3600, help="access token lifetime in seconds")
+    parser.add_argument("--user", default="test@example.com:password", help="email:password of the test user")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = MockServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.seed, args.token_lifetime)
+    email, _, password = args.user.partition(":")
+    server.state.add_user(email, password)
+    logging.getLogger("IntegrityCore.MockServer").info(f"Mock server listening on {server.url} (user {email})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
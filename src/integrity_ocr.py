@@ -0,0 +1,607 @@
+import os
+import json
+import time
+import struct
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import easyocr
+
+class OCRReaderCache:
+    """
+    Process-wide cache of loaded EasyOCR readers, keyed by language list,
+    device and slot. Slots let a worker pool keep one reader per thread
+    while still reusing readers across pools and ScreenAnalyzer instances.
+
+    Loading a reader takes tens of seconds, so warm_up() can start it in the
+    background at launch and report progress to listeners.
+    """
+    _instance: Optional['OCRReaderCache'] = None
+
+    def __init__(self):
+        if OCRReaderCache._instance is not None:
+            raise RuntimeError("Use OCRReaderCache.get_instance() instead")
+
+        self.logger = logging.getLogger("IntegrityCore.OCRReaderCache")
+        self._readers: Dict[Tuple, easyocr.Reader] = {}
+        self._loading: Dict[Tuple, threading.Event] = {}
+        self._errors: Dict[Tuple, Exception] = {}
+        self._listeners: List[Callable[[str, float], None]] = []
+        self._lock = threading.Lock()
+
+        OCRReaderCache._instance = self
+
+    @staticmethod
+    def get_instance() -> 'OCRReaderCache':
+        if OCRReaderCache._instance is None:
+            OCRReaderCache()
+        return OCRReaderCache._instance
+
+    @staticmethod
+    def make_key(languages: Sequence[str], gpu: bool = False, slot: int = 0) -> Tuple:
+        return (tuple(sorted(languages)), bool(gpu), int(slot))
+
+    def add_listener(self, callback: Callable[[str, float], None]):
+        """Register a callback(message, fraction) for load progress"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, float], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _report(self, message: str, fraction: float):
+        self.logger.info(message)
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(message, fraction)
+            except Exception as e:
+                self.logger.error(f"OCR progress listener failed: {e}")
+
+    def is_ready(self, languages: Sequence[str], gpu: bool = False, slot: int = 0) -> bool:
+        with self._lock:
+            return self.make_key(languages, gpu, slot) in self._readers
+
+    def get(self, languages: Sequence[str], gpu: bool = False, slot: int = 0) -> easyocr.Reader:
+        """Return the cached reader, loading it or waiting for a load in progress"""
+        key = self.make_key(languages, gpu, slot)
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is not None:
+                return reader
+            event = self._loading.get(key)
+            owner = event is None
+            if owner:
+                event = self._loading[key] = threading.Event()
+                self._errors.pop(key, None)
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                if key in self._readers:
+                    return self._readers[key]
+                raise RuntimeError(f"OCR reader failed to load: {self._errors.get(key)}")
+
+        try:
+            start_time = time.time()
+            reader = easyocr.Reader(list(key[0]), gpu=key[1], verbose=False)
+            with self._lock:
+                self._readers[key] = reader
+            self.logger.info(f"EasyOCR reader {key} loaded in {time.time() - start_time:.1f} seconds")
+            return reader
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = e
+            self.logger.error(f"Failed to initialize OCR reader: {e}")
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+    def warm_up(self, languages: Sequence[str], gpu: bool = False, slots: int = 1) -> threading.Thread:
+        """Load readers for the given slots in a background thread"""
+        def load():
+            total = max(1, int(slots))
+            for slot in range(total):
+                self._report(f"Loading OCR models ({slot + 1}/{total})...", slot / total)
+                try:
+                    self.get(languages, gpu, slot)
+                except Exception as e:
+                    self._report(f"OCR models failed to load: {e}", 1.0)
+                    return
+            self._report("OCR models ready", 1.0)
+
+        thread = threading.Thread(target=load, name="IntegrityOCRWarmup", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._readers.clear()
+
+
+class OCRWorkerPool:
+    """
+    Thread pool for OCR jobs where every worker thread owns its own EasyOCR
+    reader, taken from the shared OCRReaderCache by worker slot.
+
+    PyTorch releases the GIL during inference, so independent readers on
+    separate threads run in parallel without the memory cost of a process
+    per worker.
+    """
+
+    def __init__(self, threads: int = 4, timeout: float = 300,
+                 languages: Optional[List[str]] = None, gpu: bool = False):
+        self.threads = max(1, int(threads))
+        self.timeout = timeout
+        self.languages = list(languages or ['en'])
+        self.gpu = gpu
+        self.logger = logging.getLogger("IntegrityCore.OCRWorkerPool")
+        self._local = threading.local()
+        self._slot_lock = threading.Lock()
+        self._next_slot = 0
+        self._limit_torch_threads()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix="IntegrityOCR"
+        )
+        self.logger.info(f"OCR worker pool started with {self.threads} threads")
+
+    def _limit_torch_threads(self):
+        """Split the cores between workers so readers don't oversubscribe the CPU"""
+        try:
+            import torch
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.threads))
+        except Exception as e:
+            self.logger.debug(f"Could not limit torch threads: {e}")
+
+    def _worker_reader(self) -> easyocr.Reader:
+        """EasyOCR reader owned by the calling worker thread"""
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            with self._slot_lock:
+                slot = self._local.slot = self._next_slot
+                self._next_slot += 1
+        return OCRReaderCache.get_instance().get(self.languages, self.gpu, slot)
+
+    def _run(self, job: Callable[[Optional[easyocr.Reader]], Any], needs_reader: bool) -> Any:
+        return job(self._worker_reader() if needs_reader else None)
+
+    def submit(self, job: Callable[[Optional[easyocr.Reader]], Any], needs_reader: bool = True) -> Future:
+        """Queue a job; it is called with the worker's reader, or None if it needs none"""
+        future = self._executor.submit(self._run, job, needs_reader)
+        future.submitted_at = time.time()
+        return future
+
+    def gather(self, futures: Sequence[Future], timeout: Optional[float] = None,
+               cancel: Optional[threading.Event] = None) -> List[Any]:
+        """
+        Wait for submitted jobs, enforcing the per-job timeout measured from submission
+        Args:
+            futures: Futures returned by submit()
+            timeout: Per-job timeout, defaults to the pool's
+            cancel: Event that abandons all remaining jobs once set
+        Returns:
+            Job results in submission order, None for jobs that timed out or were cancelled
+        """
+        timeout = self.timeout if timeout is None else timeout
+        results = []
+
+        for future in futures:
+            deadline = future.submitted_at + timeout
+            while True:
+                if cancel is not None and cancel.is_set():
+                    future.cancel()
+                    results.append(None)
+                    break
+                remaining = deadline - time.time()
+                try:
+                    # Wake up regularly to notice cancellation
+                    wait = remaining if cancel is None else min(remaining, 0.1)
+                    results.append(future.result(timeout=max(0.0, wait)))
+                    break
+                except FutureTimeoutError:
+                    if time.time() < deadline:
+                        continue
+                    # A running job cannot be interrupted; drop its result instead
+                    future.cancel()
+                    self.logger.warning(f"OCR job timed out after {timeout}s")
+                    results.append(None)
+                    break
+
+        return results
+
+    def readtext(self, images: Sequence[np.ndarray], **kwargs) -> List[Optional[list]]:
+        """Run readtext on each image in parallel"""
+        futures = [self.submit(lambda reader, image=image: reader.readtext(image, **kwargs)) for image in images]
+        return self.gather(futures)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self.logger.info("OCR worker pool stopped")
+
+
+def pack_crops(crops: Sequence[np.ndarray], canvas_size: int = 2560,
+               padding: int = 32) -> List[Tuple[np.ndarray, List[Tuple[int, int, int, int, int]]]]:
+    """
+    Shelf-pack grayscale crops onto white canvases so that several small
+    regions go through detection and recognition in a single reader call.
+
+    canvas_size should not exceed the detector's canvas (EasyOCR's default
+    is 2560) or the canvas gets downscaled and small text is lost. Padding
+    keeps the detector from linking text across neighbouring crops. Crops
+    larger than a canvas get a canvas of their own.
+    Returns:
+        List of (canvas, placements) with placements as (index, x, y, w, h)
+    """
+    bins = []
+    current = None
+    order = sorted(range(len(crops)), key=lambda i: crops[i].shape[0], reverse=True)
+
+    for index in order:
+        h, w = crops[index].shape[:2]
+        if h + 2 * padding > canvas_size or w + 2 * padding > canvas_size:
+            bins.append({"placements": [(index, padding, padding, w, h)],
+                         "width": w + 2 * padding, "height": h + 2 * padding})
+            continue
+
+        if current is not None and current["x"] + w + padding > canvas_size:
+            # Start a new shelf below the current one
+            current["x"], current["y"], current["shelf"] = padding, current["y"] + current["shelf"], 0
+        if current is None or current["y"] + h + padding > canvas_size:
+            current = {"placements": [], "x": padding, "y": padding, "shelf": 0, "width": 0, "height": 0}
+            bins.append(current)
+
+        current["placements"].append((index, current["x"], current["y"], w, h))
+        current["x"] += w + padding
+        current["shelf"] = max(current["shelf"], h + padding)
+        current["width"] = max(current["width"], current["x"])
+        current["height"] = max(current["height"], current["y"] + h + padding)
+
+    packed = []
+    for packed_bin in bins:
+        canvas = np.full((packed_bin["height"], packed_bin["width"]), 255, dtype=np.uint8)
+        for index, x, y, w, h in packed_bin["placements"]:
+            canvas[y:y + h, x:x + w] = crops[index]
+        packed.append((canvas, packed_bin["placements"]))
+    return packed
+
+
+def unpack_results(results: list, placements: List[Tuple[int, int, int, int, int]]) -> Dict[int, list]:
+    """
+    Map readtext output for a packed canvas back onto the source crops
+    Returns:
+        Dict of crop index to readtext-style results in crop coordinates
+    """
+    unpacked = {index: [] for index, *_ in placements}
+    for bbox, text, confidence in results:
+        center_x = sum(float(p[0]) for p in bbox) / len(bbox)
+        center_y = sum(float(p[1]) for p in bbox) / len(bbox)
+        for index, x, y, w, h in placements:
+            if x <= center_x < x + w and y <= center_y < y + h:
+                unpacked[index].append(
+                    ([[float(px) - x, float(py) - y] for px, py in bbox], text, confidence)
+                )
+                break
+    return unpacked
+
+
+class OCRResult:
+    """
+    Compact, array-backed OCR output that keeps the per-box layout.
+
+    Boxes are stored as an (N, 4, 2) float32 array of corner points and
+    confidences as a float32 array, so selecting, translating and merging
+    results are vectorized array operations. Each box also records the
+    name of the capture target it came from.
+    """
+    __slots__ = ("boxes", "texts", "confidences", "sources")
+
+    def __init__(self, boxes: Optional[np.ndarray] = None, texts: Optional[Sequence[str]] = None,
+                 confidences: Optional[np.ndarray] = None, sources: Optional[Sequence[str]] = None):
+        self.texts = list(texts or [])
+        count = len(self.texts)
+        self.boxes = np.zeros((0, 4, 2), dtype=np.float32) if boxes is None else \
+            np.asarray(boxes, dtype=np.float32).reshape(count, 4, 2)
+        self.confidences = np.zeros(0, dtype=np.float32) if confidences is None else \
+            np.asarray(confidences, dtype=np.float32).reshape(count)
+        self.sources = list(sources) if sources is not None else [""] * count
+
+    @classmethod
+    def from_readtext(cls, results: Optional[list], source: str = "") -> 'OCRResult':
+        """Build a result from EasyOCR readtext output"""
+        if not results:
+            return cls()
+        return cls(
+            np.array([bbox for bbox, _, _ in results], dtype=np.float32),
+            [text for _, text, _ in results],
+            np.array([confidence for _, _, confidence in results], dtype=np.float32),
+            [source] * len(results)
+        )
+
+    @classmethod
+    def concat(cls, results: Sequence['OCRResult']) -> 'OCRResult':
+        results = [result for result in results if len(result)]
+        if not results:
+            return cls()
+        if len(results) == 1:
+            return results[0]
+        return cls(
+            np.concatenate([result.boxes for result in results]),
+            [text for result in results for text in result.texts],
+            np.concatenate([result.confidences for result in results]),
+            [source for result in results for source in result.sources]
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __repr__(self) -> str:
+        return f"OCRResult({len(self)} boxes, confidence={self.confidence:.2f})"
+
+    def select(self, indices) -> 'OCRResult':
+        """Subset by an index array or boolean mask"""
+        indices = np.arange(len(self))[indices]
+        return OCRResult(
+            self.boxes[indices],
+            [self.texts[i] for i in indices],
+            self.confidences[indices],
+            [self.sources[i] for i in indices]
+        )
+
+    def translate(self, dx: float, dy: float) -> 'OCRResult':
+        """Copy with every box shifted by (dx, dy)"""
+        return OCRResult(self.boxes + np.float32((dx, dy)), self.texts, self.confidences, self.sources)
+
+    def with_source(self, source: str) -> 'OCRResult':
+        return OCRResult(self.boxes, self.texts, self.confidences, [source] * len(self))
+
+    def centers(self) -> np.ndarray:
+        """(N, 2) array of box centers"""
+        return self.boxes.mean(axis=1)
+
+    def line_groups(self, tolerance: float = 0.5) -> List[np.ndarray]:
+        """
+        Group boxes into text lines in reading order
+        Args:
+            tolerance: Fraction of the box height by which vertical centers
+                may differ and still count as the same line
+        Returns:
+            List of index arrays, one per line, each ordered left to right.
+            Boxes from different sources never share a line.
+        """
+        if not len(self):
+            return []
+
+        centers_y = self.centers()[:, 1]
+        heights = np.ptp(self.boxes[:, :, 1], axis=1)
+        lefts = self.boxes[:, :, 0].min(axis=1)
+
+        lines = []
+        for source in dict.fromkeys(self.sources):
+            members = [i for i, name in enumerate(self.sources) if name == source]
+            members.sort(key=lambda i: centers_y[i])
+
+            line = [members[0]]
+            line_y, line_height = centers_y[members[0]], heights[members[0]]
+            for i in members[1:]:
+                if centers_y[i] - line_y > tolerance * max(line_height, heights[i]):
+                    lines.append(line)
+                    line = []
+                    line_height = 0.0
+                line.append(i)
+                line_y = centers_y[line].mean()
+                line_height = max(line_height, heights[i])
+            lines.append(line)
+
+        return [np.array(sorted(line, key=lambda i: lefts[i])) for line in lines]
+
+    def lines(self) -> List[str]:
+        """Text of each line in reading order"""
+        return [" ".join(self.texts[i] for i in line) for line in self.line_groups()]
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.lines())
+
+    @property
+    def confidence(self) -> float:
+        return float(self.confidences.mean()) if len(self) else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form with coordinates rounded to 0.1 px"""
+        return {
+            "boxes": np.round(self.boxes, 1).reshape(len(self), 8).tolist(),
+            "texts": self.texts,
+            "confidences": np.round(self.confidences, 4).tolist(),
+            "sources": self.sources
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'OCRResult':
+        return cls(data["boxes"], data["texts"], data["confidences"], data.get("sources"))
+
+    def to_bytes(self) -> bytes:
+        """Binary form: length-prefixed JSON header followed by the raw float32 arrays"""
+        header = json.dumps({"texts": self.texts, "sources": self.sources},
+                            ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + self.boxes.tobytes() + self.confidences.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'OCRResult':
+        (length,) = struct.unpack_from("<I", data)
+        header = json.loads(data[4:4 + length].decode("utf-8"))
+        count = len(header["texts"])
+        offset = 4 + length
+        boxes = np.frombuffer(data, dtype=np.float32, count=count * 8, offset=offset)
+        confidences = np.frombuffer(data, dtype=np.float32, count=count, offset=offset + count * 32)
+        return cls(boxes.copy(), header["texts"], confidences.copy(), header["sources"])
+
+
+class OCRResultCache:
+    """
+    Content-addressed cache of OCR results. Screens return to the same
+    states all the time (the same dialog, the same editor view), so a
+    BLAKE2 hash of a crop plus the settings that shape its OCR output maps
+    straight to the result recognized last time.
+
+    Recently used results are kept in an in-memory LRU. With a cache_dir,
+    results are also written to disk so they survive restarts, and the
+    least recently used files are evicted past max_disk_bytes. Files not
+    used for max_age seconds are deleted as well, so cached screen text
+    does not outlive the history retention.
+    """
+
+    def __init__(self, max_entries: int = 512, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 64 * 1024 * 1024, max_age: Optional[float] = None):
+        self.max_entries = max(0, int(max_entries))
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = int(max_disk_bytes)
+        self.max_age = max_age
+        self.logger = logging.getLogger("IntegrityCore.OCRResultCache")
+        self._memory: 'OrderedDict[str, OCRResult]' = OrderedDict()
+        # key -> (size, last used), least recently used first
+        self._disk: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(cache_dir):
+                if name.endswith(".ocr"):
+                    stat = os.stat(os.path.join(cache_dir, name))
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for mtime, key, size in sorted(entries):
+                self._disk[key] = (size, mtime)
+                self._disk_bytes += size
+            with self._lock:
+                self._trim_disk()
+
+    @staticmethod
+    def make_key(image: np.ndarray, *context: Any) -> str:
+        """
+        Hash an image together with anything else that affects its OCR output
+        Args:
+            image: Crop to be recognized
+            context: Preprocessing profile, reader languages and similar settings
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((image.shape, image.dtype.str) + context).encode("utf-8"))
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".ocr")
+
+    def get(self, key: str) -> Optional[OCRResult]:
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    result = OCRResult.from_bytes(f.read())
+                os.utime(self._path(key))
+                with self._lock:
+                    if key in self._disk:
+                        self._disk[key] = (self._disk[key][0], time.time())
+                        self._disk.move_to_end(key)
+                    self._remember(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return result
+            except Exception as e:
+                self.logger.warning(f"Dropping unreadable OCR cache entry {key}: {e}")
+                with self._lock:
+                    self._forget_disk(key)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: OCRResult):
+        with self._lock:
+            self._remember(key, result)
+            if not self.cache_dir or key in self._disk:
+                return
+
+        data = result.to_bytes()
+        temp_path = self._path(key) + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            self.logger.warning(f"Failed to write OCR cache entry: {e}")
+            return
+
+        with self._lock:
+            self._disk[key] = (len(data), time.time())
+            self._disk_bytes += len(data)
+            self._trim_disk()
+
+    def _remember(self, key: str, result: OCRResult):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _forget_disk(self, key: str):
+        entry = self._disk.pop(key, None)
+        if entry is None:
+            return
+        self._disk_bytes -= entry[0]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _trim_disk(self):
+        """Evict expired and least recently used files; the caller holds the lock"""
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            while self._disk and next(iter(self._disk.values()))[1] < cutoff:
+                self._forget_disk(next(iter(self._disk)))
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            self._forget_disk(next(iter(self._disk)))
+
+    def expire(self):
+        """Delete disk entries older than max_age"""
+        with self._lock:
+            self._trim_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk):
+                self._forget_disk(key)
@@ -0,0 +1,222 @@
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# HTTP statuses worth retrying; any other 4xx means the request itself is bad
+RETRYABLE_STATUSES = {408, 425, 429}
+
+# The session expired; the item is retried once the session is refreshed
+UNAUTHORIZED_STATUS = 401
+
+class Outbox:
+    """
+    Durable queue of requests waiting to reach the server.
+
+    Items are written to SQLite before enqueue() returns, so nothing is
+    lost when the server is slow or unreachable or the app exits. A
+    background task on the event loop drains the queue, running at most
+    max_concurrency deliveries at once. Failed deliveries are retried with
+    exponential backoff and jitter; items rejected outright (4xx other
+    than timeouts, rate limits and an expired session) are dropped and
+    passed to on_drop.
+
+    Each item records the user it was queued for. Only the current user's
+    items are delivered, and discard_other_users() removes the rest.
+
+    Every item carries an idempotency key that goes out with each attempt,
+    so the server can discard duplicates when an earlier attempt did reach
+    it but the response was lost.
+    """
+
+    def __init__(self, db_path: str, send: Callable[[str, Dict[str, Any], Optional[bytes], str], Awaitable[Any]],
+                 max_concurrency: int = 2, base_delay: float = 1.0, max_delay: float = 300.0,
+                 on_drop: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.db_path = db_path
+        self.send = send
+        self.on_drop = on_drop
+        self.user_id: Optional[str] = None
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.logger = logging.getLogger("IntegrityCore.Outbox")
+        self.delivered = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._in_flight: Dict[int, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                blob BLOB,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                created REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox(next_attempt);
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")]
+        if "user_id" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN user_id TEXT")
+        self._conn.commit()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], blob: Optional[bytes] = None,
+                key: Optional[str] = None, user_id: Optional[str] = None) -> str:
+        """
+        Persist a request for delivery; safe to call from any thread
+        Args:
+            kind: Delivery type understood by the send callback
+            payload: JSON-serializable request data
+            blob: Optional binary body such as an encoded screenshot
+            key: Idempotency key, generated if omitted
+            user_id: User the request is sent as, the current user if omitted
+        Returns:
+            The item's idempotency key
+        """
+        key = key or uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, kind, payload, blob, next_attempt, created, user_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload, separators=(",", ":")), blob, now, now, user_id or self.user_id)
+            )
+        self._wake()
+        return key
+
+    def discard_other_users(self, user_id: str) -> int:
+        """
+        Deliver only user_id's items from now on and drop those queued for
+        anyone else, e.g. left over from another account; they could never
+        be sent as this user
+        Returns:
+            Number of items discarded
+        """
+        with self._lock, self._conn:
+            self.user_id = user_id
+            discarded = self._conn.execute("DELETE FROM outbox WHERE user_id IS NOT ?", (user_id,)).rowcount
+        if discarded:
+            self.logger.warning(f"Discarded {discarded} queued requests of another user")
+        return discarded
+
+    def _wake(self):
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        """Start the sender on the running event loop if it is not running yet"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def _due(self, limit: int) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, kind, payload, blob, attempts, next_attempt FROM outbox "
+                "WHERE user_id IS ? ORDER BY next_attempt LIMIT ?",
+                (self.user_id, limit + len(self._in_flight))
+            ).fetchall()
+        return [row for row in rows if row[0] not in self._in_flight]
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        def finished(_):
+            semaphore.release()
+            self._wakeup.set()
+
+        while True:
+            self._wakeup.clear()
+            # Sleep until the next retry is due, a delivery finishes or
+            # something new is enqueued
+            wait = self.max_delay
+            for row in self._due(self.max_concurrency):
+                if row[6] > time.time():
+                    wait = min(wait, row[6] - time.time())
+                    break
+                await semaphore.acquire()
+                task = self._in_flight[row[0]] = asyncio.ensure_future(self._deliver(row))
+                task.add_done_callback(finished)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.05, wait))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, row: tuple):
+        item_id, key, kind, payload, blob, attempts, _ = row
+        try:
+            await self.send(kind, json.loads(payload), blob, key)
+        except Exception as e:
+            status = getattr(e, "status", None)
+            if (status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUSES
+                    and status != UNAUTHORIZED_STATUS):
+                self.logger.error(f"Outbox item {key} rejected with HTTP {status}, dropping it: {e}")
+                self._remove(item_id)
+                self.failed += 1
+                if self.on_drop is not None:
+                    try:
+                        self.on_drop(kind, json.loads(payload))
+                    except Exception as drop_error:
+                        self.logger.error(f"Failed to handle dropped outbox item {key}: {drop_error}")
+            else:
+                # Exponential backoff with jitter, so clients that went
+                # offline together do not retry in lockstep
+                delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE id = ?",
+                        (time.time() + delay, str(e)[:500], item_id)
+                    )
+                self.logger.warning(f"Delivery of {kind} {key} failed (attempt {attempts + 1}), retrying in {delay:.1f}s: {e}")
+        else:
+            self._remove(item_id)
+            self.delivered += 1
+        finally:
+            self._in_flight.pop(item_id, None)
+
+    def _remove(self, item_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending, oldest = self._conn.execute("SELECT COUNT(*), MIN(created) FROM outbox").fetchone()
+        return {
+            "pending": pending,
+            "in_flight": len(self._in_flight),
+            "oldest": oldest,
+            "delivered": self.delivered,
+            "failed": self.failed
+        }
+
+    async def stop(self):
+        """Stop the sender; undelivered items stay on disk for the next start"""
+        tasks = list(self._in_flight.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        await self.stop()
+        with self._lock:
+            self._conn.close()
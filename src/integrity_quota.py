@@ -0,0 +1,210 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+class QuotaTracker:
+    """
+    Local copy of the user's question quota (questions_limit and
+    questions_used in user_profiles).
+
+    The tracker is seeded from the profile once and then hands out
+    permits without a network round-trip. Questions charged locally are
+    kept as a pending count, saved to disk so they survive restarts, and
+    reconciled with the server in one atomic increment every
+    sync_interval seconds or on close(). Each increment returns the
+    authoritative row, which replaces the local copy. The server charges
+    up to questions_limit, so questions past it, e.g. after another
+    device used up the quota, are not counted. An increment the server
+    refuses, e.g. because the profile is missing, drops the pending
+    questions and unseeds the tracker so it is seeded afresh.
+    """
+
+    def __init__(self, path: str, send: Callable[[int], Awaitable[Dict[str, Any]]], sync_interval: float = 30.0,
+                 is_rejected: Optional[Callable[[Exception], bool]] = None):
+        self.path = path
+        self.send = send
+        self.sync_interval = sync_interval
+        self.is_rejected = is_rejected
+        self.logger = logging.getLogger("IntegrityCore.QuotaTracker")
+        self.user_id: Optional[str] = None
+        self.limit: Optional[int] = None
+        self.used = 0
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.user_id = state.get("user_id")
+            self.pending = max(0, int(state.get("pending", 0)))
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError) as e:
+            self.logger.warning(f"Ignoring corrupt quota state: {e}")
+        if self.pending:
+            self.logger.info(f"{self.pending} questions pending sync from a previous session")
+
+    def _save(self):
+        """Persist the pending count; caller holds _lock"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"user_id": self.user_id, "pending": self.pending}, f)
+        os.replace(temp_path, self.path)
+
+    @property
+    def seeded(self) -> bool:
+        return self.limit is not None
+
+    def set_user(self, user_id: str):
+        """Track the quota of user_id, discarding another user's unsynced questions"""
+        with self._lock:
+            self._set_user(user_id)
+            self._save()
+
+    def _set_user(self, user_id: str):
+        if user_id == self.user_id:
+            return
+        if self.pending:
+            self.logger.warning(f"Discarding {self.pending} unsynced questions of another user")
+            self.pending = 0
+        self.user_id = user_id
+        self.limit = None
+        self.used = 0
+
+    def seed(self, profile: Dict[str, Any]):
+        """
+        Take the server's counters from a user_profiles row
+        Args:
+            profile: Row with user_id, questions_limit and questions_used
+        """
+        with self._lock:
+            self._set_user(profile.get("user_id", self.user_id))
+            self.limit = profile.get("questions_limit", self.limit)
+            self.used = profile.get("questions_used", self.used)
+            self._save()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters as the user sees them, including unsynced questions"""
+        with self._lock:
+            used = self.used + self.pending
+            return {
+                "questions_limit": self.limit,
+                "questions_used": used,
+                "questions_remaining": None if self.limit is None else max(0, self.limit - used)
+            }
+
+    def acquire(self) -> bool:
+        """
+        Charge one question locally
+        Returns:
+            False if the quota is used up. An unseeded tracker always grants
+            the permit and leaves enforcement to the server.
+        """
+        with self._lock:
+            if self.limit is not None and self.used + self.pending >= self.limit:
+                return False
+            self.pending += 1
+            self._save()
+        self.schedule_sync()
+        return True
+
+    def release(self):
+        """Return a permit for a question that never reached the server"""
+        with self._lock:
+            if self.pending:
+                self.pending -= 1
+                self._save()
+
+    def start(self):
+        """Resume syncing after close() and schedule a sync of pending questions"""
+        self._closed = False
+        self.schedule_sync()
+
+    def schedule_sync(self):
+        """Sync pending questions after sync_interval unless a sync is already scheduled or the tracker is closed"""
+        if self._closed:
+            return
+        if self.pending and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.get_running_loop().create_task(self._sync_later())
+
+    async def _sync_later(self):
+        await asyncio.sleep(self.sync_interval)
+        self._timer = None
+        await self.sync()
+
+    async def sync(self) -> int:
+        """
+        Send pending questions to the server in a single increment
+        Returns:
+            Number of questions synced, 0 if the tracker is closed
+        """
+        if self._closed:
+            return 0
+        return await self._sync()
+
+    async def _sync(self) -> int:
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+
+        async with self._sync_lock:
+            with self._lock:
+                amount = self.pending
+            if not amount:
+                return 0
+
+            try:
+                row = await self.send(amount)
+                if not row:
+                    raise ValueError("no profile row returned")
+            except Exception as e:
+                if self.is_rejected is not None and self.is_rejected(e):
+                    self.logger.error(f"Quota sync rejected, dropping {amount} questions: {e}")
+                    with self._lock:
+                        self.pending = max(0, self.pending - amount)
+                        self.limit = None
+                        self.used = 0
+                        self._save()
+                    return 0
+                self.logger.warning(f"Quota sync failed, {amount} questions kept for retry: {e}")
+                self.schedule_sync()
+                return 0
+
+            with self._lock:
+                if self.limit is not None:
+                    uncharged = amount - (row.get("questions_used", self.used + amount) - self.used)
+                    if uncharged > 0:
+                        self.logger.warning(f"Question limit reached on the server, {uncharged} questions not charged")
+                # Questions charged while the request was in flight stay pending
+                self.pending = max(0, self.pending - amount)
+                self.limit = row.get("questions_limit", self.limit)
+                self.used = row.get("questions_used", self.used + amount)
+                self._save()
+
+        self.logger.debug(f"Synced {amount} questions, {self.used} used of {self.limit}")
+        return amount
+
+    async def close(self):
+        """
+        Cancel the sync timer and send everything still pending. Questions a
+        failed final sync leaves behind stay on disk for the next start()
+        instead of being retried, e.g. after the user has signed out.
+        """
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self._sync()
+
+    def reset(self):
+        """Forget the seeded counters, e.g. on logout"""
+        with self._lock:
+            self.limit = None
+            self.used = 0
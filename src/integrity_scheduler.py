@@ -0,0 +1,86 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Optional
+
+class AdaptiveScheduler:
+    """
+    Decides how long the monitoring loop waits before the next capture.
+
+    The interval halves whenever a capture shows a changed screen and grows
+    by the backoff factor for every unchanged one, staying between
+    min_interval and max_interval. On top of that, the delay is stretched
+    so the process's CPU time over a tick and the wait that follows stays
+    within cpu_budget percent of the machine's total CPU capacity.
+
+    After a stall, such as a suspended laptop, the missed ticks are dropped
+    rather than run back to back, and capture restarts at the fastest
+    interval because the screen has most likely changed in the meantime.
+    """
+
+    def __init__(self, min_interval: float = 0.5, max_interval: float = 10.0,
+                 cpu_budget: float = 10.0, backoff: float = 1.5,
+                 initial_interval: Optional[float] = None):
+        self.min_interval = max(0.01, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.cpu_budget = max(0.1, float(cpu_budget))
+        self.backoff = max(1.0, float(backoff))
+        self.interval = self._clamp(initial_interval if initial_interval is not None else self.min_interval)
+        self.logger = logging.getLogger("IntegrityCore.AdaptiveScheduler")
+
+        # Average CPU load of recent ticks, as a fraction of total capacity
+        self.cpu_load = 0.0
+        self.stalls = 0
+        self._cores = os.cpu_count() or 1
+        self._tick_start: Optional[float] = None
+        self._tick_cpu = 0.0
+        self._deadline: Optional[float] = None
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def begin(self):
+        """Mark the start of a capture tick"""
+        now = time.monotonic()
+        if self._deadline is not None and now - self._deadline > self.max_interval:
+            self.stalls += 1
+            self.logger.info(
+                f"Capture resumed {now - self._deadline:.1f}s late, skipping missed ticks"
+            )
+            self.interval = self.min_interval
+        self._tick_start = now
+        self._tick_cpu = time.process_time()
+
+    def end(self, changed: bool) -> float:
+        """
+        Mark the end of a capture tick
+        Args:
+            changed: Whether the capture found a changed screen
+        Returns:
+            Seconds to wait before the next tick
+        """
+        now = time.monotonic()
+        work_time = now - self._tick_start if self._tick_start is not None else 0.0
+        cpu_time = time.process_time() - self._tick_cpu
+
+        if changed:
+            self.interval = self._clamp(self.interval / 2)
+        else:
+            self.interval = self._clamp(self.interval * self.backoff)
+
+        # Stretch the cycle until the CPU spent in it fits the budget
+        budget = self.cpu_budget / 100 * self._cores
+        cycle = max(self.interval, cpu_time / budget)
+        delay = max(0.0, cycle - work_time)
+
+        self.cpu_load = 0.8 * self.cpu_load + 0.2 * (cpu_time / max(cycle, work_time, 1e-6) / self._cores)
+        self._deadline = now + delay
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "cpu_load": self.cpu_load,
+            "cpu_budget": self.cpu_budget / 100,
+            "stalls": self.stalls
+        }
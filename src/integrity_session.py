@@ -0,0 +1,165 @@
+import json
+import time
+import base64
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+def decode_jwt_claims(token: str) -> Dict[str, Any]:
+    """
+    Read the claims of a JWT without verifying its signature. Only used to
+    learn when our own access token expires; the server still verifies it.
+    Returns:
+        Claims dict, empty if the token cannot be decoded
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims if isinstance(claims, dict) else {}
+    except (IndexError, ValueError, TypeError):
+        return {}
+
+class SessionManager:
+    """
+    Tracks the Supabase access token and decides locally whether it is
+    still good, so requests do not have to ask the server first.
+
+    The expiry comes from the token's exp claim. The session counts as
+    valid until expiry_margin seconds before then. A background task
+    refreshes it refresh_margin seconds before expiry. If a request finds
+    the token already expired, it refreshes on the spot. Concurrent
+    refreshes share one request, so a refresh token is never spent twice.
+    """
+
+    # Delay before retrying a failed background refresh
+    RETRY_INTERVAL = 30
+
+    def __init__(self, refresh: Callable[[str], Awaitable[Dict[str, Any]]],
+                 on_refresh: Optional[Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]] = None,
+                 refresh_margin: float = 300, expiry_margin: float = 60):
+        """
+        Args:
+            refresh: Exchanges a refresh token for a new session dict with
+                access_token, refresh_token and optionally expires_at
+            on_refresh: Called with each new session, e.g. to persist it;
+                may be a coroutine function
+            refresh_margin: Seconds before expiry to refresh in the background
+            expiry_margin: Seconds before expiry to stop trusting the token
+        """
+        self.refresh_fn = refresh
+        self.on_refresh = on_refresh
+        self.refresh_margin = max(refresh_margin, expiry_margin)
+        self.expiry_margin = expiry_margin
+        self.logger = logging.getLogger("IntegrityCore.SessionManager")
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    def set_tokens(self, access_token: Optional[str], refresh_token: Optional[str] = None,
+                   expires_at: Optional[float] = None):
+        """
+        Replace the current session
+        Args:
+            access_token: JWT access token, None to clear the session
+            refresh_token: Token used to obtain the next access token
+            expires_at: Fallback expiry if the token carries no exp claim
+        """
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        exp = decode_jwt_claims(access_token).get("exp") if access_token else None
+        self.expires_at = float(exp or expires_at) if (exp or expires_at) else None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def clear(self):
+        self.set_tokens(None)
+
+    @property
+    def valid(self) -> bool:
+        """Whether the access token can be used without asking the server"""
+        if not self.access_token:
+            return False
+        if self.expires_at is None:
+            return True
+        return time.time() < self.expires_at - self.expiry_margin
+
+    def schedule_refresh(self):
+        """Refresh in the background shortly before expiry unless already scheduled"""
+        if not self.refresh_token or self.expires_at is None:
+            return
+        if self._timer is None or self._timer.done():
+            delay = max(0.0, self.expires_at - self.refresh_margin - time.time())
+            self._timer = asyncio.get_running_loop().create_task(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._timer = None
+        if not await self.refresh() and self.refresh_token and self.valid:
+            # Keep trying while the current token still works
+            self._timer = asyncio.get_running_loop().create_task(self._refresh_later(self.RETRY_INTERVAL))
+
+    async def ensure_valid(self) -> bool:
+        """
+        Check the session, refreshing it only if it has (nearly) expired
+        Returns:
+            True if there is a usable access token
+        """
+        if self.valid:
+            self.schedule_refresh()
+            return True
+        if not self.refresh_token:
+            return False
+        return await self.refresh()
+
+    async def refresh(self) -> bool:
+        """
+        Exchange the refresh token for a new session. Callers arriving while
+        a refresh is in flight wait for that one instead of starting another.
+        Returns:
+            True if the session was refreshed
+        """
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            self._refreshing.add_done_callback(self._refresh_done)
+        # A cancelled caller must not cancel the refresh others are waiting on
+        return await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, future: asyncio.Future):
+        if self._refreshing is future:
+            self._refreshing = None
+
+    async def _refresh(self) -> bool:
+        refresh_token = self.refresh_token
+        if not refresh_token:
+            return False
+        try:
+            session = await self.refresh_fn(refresh_token)
+        except Exception as e:
+            self.logger.warning(f"Session refresh failed: {e}")
+            return False
+
+        if self.refresh_token != refresh_token:
+            # Logged out or replaced by a new login while the request was in flight
+            return self.valid
+        self.set_tokens(session["access_token"], session.get("refresh_token") or refresh_token,
+                        session.get("expires_at"))
+        if self.on_refresh is not None:
+            try:
+                result = self.on_refresh(session)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"Failed to store refreshed session: {e}")
+        self.schedule_refresh()
+        self.logger.info("Session refreshed")
+        return True
+
+    async def close(self):
+        """Stop background refreshes"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
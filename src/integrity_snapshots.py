@@ -0,0 +1,425 @@
+import os
+import json
+import time
+import struct
+import sqlite3
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import cv2
+from integrity_preprocess import to_gray, dirty_tile_mask
+
+DELTA_MAGIC = b"ISD1"
+
+class SnapshotArchive:
+    """
+    Compact snapshot format made of periodic keyframes plus tile deltas.
+
+    A keyframe is a plain JPEG (snapshot_<timestamp>.jpg). A delta
+    (snapshot_<timestamp>.delta) stores only the tiles that differ from its
+    keyframe, each as a small JPEG. Deltas are taken against the keyframe
+    rather than the previous snapshot, so rebuilding any snapshot needs at
+    most two files and lossy encoding never accumulates.
+
+    Layout of a delta file: DELTA_MAGIC, a big-endian uint32 header length,
+    a JSON header ({"keyframe", "tile_size", "shape", "tiles": [[row, col,
+    length], ...]}) and the tile JPEGs back to back in header order.
+    """
+
+    def __init__(self, images_dir: str, quality: int = 95, tile_size: int = 128,
+                 diff_threshold: int = 16, keyframe_ratio: float = 0.3, keyframe_interval: float = 3600):
+        self.images_dir = images_dir
+        self.quality = quality
+        self.tile_size = tile_size
+        self.diff_threshold = diff_threshold
+        self.keyframe_ratio = keyframe_ratio
+        self.keyframe_interval = keyframe_interval
+
+        # The keyframe new deltas are taken against
+        self._keyframe_name: Optional[str] = None
+        self._keyframe_gray: Optional[np.ndarray] = None
+        self._keyframe_time = 0.0
+
+        # Last decoded keyframe, reused when rebuilding several deltas
+        self._decoded: Tuple[Optional[str], Optional[np.ndarray]] = (None, None)
+
+    def write(self, frame: np.ndarray, timestamp: datetime) -> Tuple[str, int, Optional[str]]:
+        """
+        Store a BGR or BGRA frame as a keyframe or a delta
+        Returns:
+            (path, size in bytes, keyframe filename or None for a keyframe)
+        """
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        gray = to_gray(frame)
+        stem = os.path.join(self.images_dir, f"snapshot_{timestamp.strftime('%Y%m%d_%H%M%S')}")
+
+        mask = None
+        if (self._keyframe_gray is not None and self._keyframe_gray.shape == gray.shape
+                and timestamp.timestamp() - self._keyframe_time < self.keyframe_interval
+                and os.path.exists(os.path.join(self.images_dir, self._keyframe_name))):
+            mask = dirty_tile_mask(gray, self._keyframe_gray, self.tile_size, self.diff_threshold)
+
+        if mask is None or mask.mean() > self.keyframe_ratio:
+            path = stem + ".jpg"
+            size = self._write_file(path, self._encode(frame))
+            self._keyframe_name = os.path.basename(path)
+            self._keyframe_gray = gray
+            self._keyframe_time = timestamp.timestamp()
+            return path, size, None
+
+        ts = self.tile_size
+        tiles = []
+        blobs = []
+        for row, col in zip(*np.nonzero(mask)):
+            blob = self._encode(frame[row * ts:(row + 1) * ts, col * ts:(col + 1) * ts])
+            tiles.append([int(row), int(col), len(blob)])
+            blobs.append(blob)
+
+        header = json.dumps({
+            "keyframe": self._keyframe_name,
+            "tile_size": ts,
+            "shape": list(frame.shape),
+            "tiles": tiles
+        }).encode("utf-8")
+        path = stem + ".delta"
+        size = self._write_file(path, b"".join([DELTA_MAGIC, struct.pack(">I", len(header)), header] + blobs))
+        return path, size, self._keyframe_name
+
+    def _encode(self, image: np.ndarray) -> bytes:
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise IOError("Could not encode snapshot")
+        return encoded.tobytes()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> int:
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    @staticmethod
+    def read_delta_header(path: str) -> Tuple[Dict[str, Any], int]:
+        """
+        Returns:
+            The delta's JSON header and the file offset of its first tile
+        """
+        with open(path, "rb") as f:
+            if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+                raise ValueError(f"{path} is not a snapshot delta")
+            (length,) = struct.unpack(">I", f.read(4))
+            return json.loads(f.read(length).decode("utf-8")), len(DELTA_MAGIC) + 4 + length
+
+    def load(self, filename: str) -> np.ndarray:
+        """Rebuild the full BGR frame of any stored snapshot"""
+        path = os.path.join(self.images_dir, os.path.basename(filename))
+        if not path.endswith(".delta"):
+            return self._load_keyframe(path)
+
+        header, offset = self.read_delta_header(path)
+        frame = self._load_keyframe(os.path.join(self.images_dir, header["keyframe"])).copy()
+        if list(frame.shape) != header["shape"]:
+            raise ValueError(f"Keyframe of {filename} does not match its delta")
+
+        ts = header["tile_size"]
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for row, col, length in header["tiles"]:
+                tile = cv2.imdecode(np.frombuffer(f.read(length), dtype=np.uint8), cv2.IMREAD_COLOR)
+                frame[row * ts:row * ts + tile.shape[0], col * ts:col * ts + tile.shape[1]] = tile
+        return frame
+
+    def _load_keyframe(self, path: str) -> np.ndarray:
+        name, decoded = self._decoded
+        if name != path:
+            decoded = cv2.imread(path, cv2.IMREAD_COLOR)
+            if decoded is None:
+                raise FileNotFoundError(f"Snapshot {path} could not be read")
+            self._decoded = (path, decoded)
+        return decoded
+
+
+class SnapshotWriter:
+    """
+    Encodes snapshots into a SnapshotArchive on a background thread so
+    encoding and retention never add to capture latency.
+
+    The queue is bounded; when it is full the oldest pending snapshot is
+    dropped, since a newer frame is always the more useful one to keep.
+    """
+
+    def __init__(self, archive: SnapshotArchive, max_queue: int = 4,
+                 on_saved: Optional[Callable[[str, datetime, int, Optional[str]], None]] = None):
+        self.archive = archive
+        self.max_queue = max(1, int(max_queue))
+        self.on_saved = on_saved
+        self.logger = logging.getLogger("IntegrityCore.SnapshotWriter")
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters, guarded by _cond
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._total_write_time = 0.0
+        self._last_write_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="IntegritySnapshotWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, timestamp: Optional[datetime] = None) -> bool:
+        """
+        Queue a BGR or BGRA frame for writing. The frame must not be modified
+        afterwards.
+        Returns:
+            False if an older queued snapshot had to be dropped to make room
+        """
+        with self._cond:
+            if self._closed:
+                return False
+
+            dropped = False
+            while len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self._dropped += 1
+                dropped = True
+
+            self._queue.append((frame, timestamp or datetime.now(), time.time()))
+            self._cond.notify()
+
+        if dropped:
+            self.logger.warning("Snapshot queue full, dropped the oldest snapshot")
+        return not dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and write latency counters"""
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "avg_write_ms": self._total_write_time / self._written * 1000 if self._written else 0.0,
+                "last_write_ms": self._last_write_time * 1000
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                frame, timestamp, queued_at = self._queue.popleft()
+
+            start_time = time.time()
+            try:
+                filename, size, keyframe = self.archive.write(frame, timestamp)
+                duration = time.time() - start_time
+                with self._cond:
+                    self._written += 1
+                    self._total_write_time += duration
+                    self._last_write_time = duration
+                self.logger.debug(
+                    f"Saved periodic snapshot: {filename} in {duration * 1000:.0f} ms "
+                    f"({(start_time - queued_at) * 1000:.0f} ms queued)"
+                )
+            except Exception as e:
+                with self._cond:
+                    self._failed += 1
+                self.logger.error(f"Failed to save periodic snapshot: {str(e)}")
+                continue
+
+            if self.on_saved is not None:
+                try:
+                    self.on_saved(filename, timestamp, size, keyframe)
+                except Exception as e:
+                    self.logger.error(f"Snapshot callback failed: {str(e)}")
+
+    def close(self, timeout: Optional[float] = None):
+        """Write out what is still queued and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+
+class SnapshotIndex:
+    """
+    SQLite index of the snapshot files in the images directory, tracking
+    filename, timestamp, size and, for deltas, the keyframe they depend on.
+    Retention queries the timestamp index and keeps a running total size,
+    so it costs O(expired) instead of listing and stat-ing the whole
+    directory. A keyframe is only removed together with its deltas.
+
+    The directory is scanned once, when the index is first created, to pick
+    up snapshots written before the index existed.
+    """
+
+    def __init__(self, images_dir: str, on_removed: Optional[Callable[[List[str]], None]] = None):
+        self.images_dir = images_dir
+        self.on_removed = on_removed
+        self.db_path = os.path.join(images_dir, "snapshots.db")
+        self.logger = logging.getLogger("IntegrityCore.SnapshotIndex")
+        self._lock = threading.Lock()
+
+        is_new = not os.path.exists(self.db_path)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                filename TEXT PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snapshots_timestamp ON snapshots(timestamp);
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(snapshots)")]
+        if "keyframe" not in columns:
+            self._conn.execute("ALTER TABLE snapshots ADD COLUMN keyframe TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_keyframe ON snapshots(keyframe)")
+
+        if is_new:
+            self.rebuild()
+
+        self._count, self._total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM snapshots"
+        ).fetchone()
+
+    @staticmethod
+    def parse_timestamp(filename: str) -> Optional[float]:
+        """Timestamp encoded in a snapshot_YYYYmmdd_HHMMSS filename"""
+        try:
+            stem = os.path.splitext(filename)[0]
+            return datetime.strptime(stem[len("snapshot_"):], "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            return None
+
+    def rebuild(self):
+        """Re-index the images directory from scratch"""
+        rows = []
+        for entry in os.scandir(self.images_dir):
+            if not entry.name.startswith("snapshot_") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            timestamp = self.parse_timestamp(entry.name) or stat.st_mtime
+            keyframe = None
+            if entry.name.endswith(".delta"):
+                try:
+                    keyframe = SnapshotArchive.read_delta_header(entry.path)[0]["keyframe"]
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Skipping unreadable snapshot delta {entry.name}: {str(e)}")
+                    continue
+            rows.append((entry.name, timestamp, stat.st_size, keyframe))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM snapshots")
+            self._conn.executemany(
+                "INSERT INTO snapshots (filename, timestamp, size, keyframe) VALUES (?, ?, ?, ?)", rows
+            )
+            self._count = len(rows)
+            self._total_size = sum(row[2] for row in rows)
+        self.logger.info(f"Indexed {len(rows)} existing snapshots")
+
+    def add(self, path: str, timestamp: datetime, size: int, keyframe: Optional[str] = None):
+        """Record a newly written snapshot; keyframe is set for deltas"""
+        filename = os.path.basename(path)
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM snapshots WHERE filename = ?", (filename,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (filename, timestamp, size, keyframe) VALUES (?, ?, ?, ?)",
+                (filename, timestamp.timestamp(), size, keyframe)
+            )
+            if previous is None:
+                self._count += 1
+                self._total_size += size
+            else:
+                self._total_size += size - previous[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"count": self._count, "total_size": self._total_size}
+
+    def list(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Tuple[str, float, int, Optional[str]]]:
+        """Indexed snapshots as (filename, timestamp, size, keyframe), oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT filename, timestamp, size, keyframe FROM snapshots "
+                "WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
+                (since if since is not None else 0, until if until is not None else float("inf"))
+            ).fetchall()
+
+    def expire(self, max_age: float, max_bytes: int, max_files: int) -> int:
+        """
+        Delete snapshots older than max_age seconds, then the oldest ones
+        until the store is within max_bytes and max_files
+        Returns:
+            Number of snapshots removed
+        """
+        with self._lock:
+            cutoff = time.time() - max_age
+
+            # Deltas first, so keyframes whose deltas all expired can follow
+            removed = self._remove(self._conn.execute(
+                "SELECT filename, size FROM snapshots WHERE keyframe IS NOT NULL AND timestamp < ?",
+                (cutoff,)
+            ).fetchall())
+            removed += self._remove(self._conn.execute(
+                "SELECT filename, size FROM snapshots AS s "
+                "WHERE keyframe IS NULL AND timestamp < ? "
+                "AND NOT EXISTS (SELECT 1 FROM snapshots AS d WHERE d.keyframe = s.filename)",
+                (cutoff,)
+            ).fetchall())
+
+            if self._total_size > max_bytes or self._count > max_files:
+                self.logger.warning("Snapshot store over its size limit, performing cleanup")
+            while self._total_size > max_bytes or self._count > max_files:
+                oldest = self._conn.execute(
+                    "SELECT filename, size, keyframe FROM snapshots ORDER BY timestamp LIMIT 1"
+                ).fetchone()
+                if oldest is None:
+                    break
+
+                filename, size, keyframe = oldest
+                group = [(filename, size)]
+                if keyframe is None:
+                    # Deltas cannot be rebuilt without their keyframe
+                    group += self._conn.execute(
+                        "SELECT filename, size FROM snapshots WHERE keyframe = ?", (filename,)
+                    ).fetchall()
+                removed += self._remove(group)
+
+            return removed
+
+    def _remove(self, rows: List[Tuple[str, int]]) -> int:
+        """Delete files and their index rows; the caller holds the lock"""
+        for filename, _ in rows:
+            try:
+                os.remove(os.path.join(self.images_dir, filename))
+                self.logger.debug(f"Removed old snapshot: {filename}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.error(f"Failed to remove snapshot {filename}: {str(e)}")
+
+        with self._conn:
+            self._conn.executemany("DELETE FROM snapshots WHERE filename = ?", [(f,) for f, _ in rows])
+        self._count -= len(rows)
+        self._total_size -= sum(size for _, size in rows)
+
+        if rows and self.on_removed is not None:
+            try:
+                self.on_removed([filename for filename, _ in rows])
+            except Exception as e:
+                self.logger.error(f"Snapshot removal callback failed: {str(e)}")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
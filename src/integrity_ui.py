@@ -1,11 +1,11 @@
 import os
 import sys
-import threading
 import asyncio
 from typing import Optional, Callable, Dict, Any
 import customtkinter as ctk
 from integrity_logger import IntegrityLogger
 from integrity_config import ConfigManager
+from integrity_async import TkAsyncBridge
 
 class SettingsDialog(ctk.CTkToplevel):
     def __init__(self, parent):
@@ -147,6 +147,21 @@ class SettingsDialog(ctk.CTkToplevel):
             textvariable=self.max_size_var
         )
         max_size_entry.pack(side="left", padx=5)
+        
+        # Preprocessing profile
+        profile_frame = ctk.CTkFrame(tab)
+        profile_frame.pack(anchor="w", fill="x", padx=10, pady=10)
+        
+        profile_label = ctk.CTkLabel(profile_frame, text="Preprocessing profile:")
+        profile_label.pack(side="left", padx=5)
+        
+        self.profile_var = ctk.StringVar(value=self.config.get("analysis.preprocess_profile", "balanced"))
+        profile_menu = ctk.CTkOptionMenu(
+            profile_frame,
+            values=["fast", "balanced", "quality"],
+            variable=self.profile_var
+        )
+        profile_menu.pack(side="left", padx=5)
     
     def _reset_settings(self):
         self.config.reset()
@@ -166,6 +181,7 @@ class SettingsDialog(ctk.CTkToplevel):
             self.config.set("analysis.timeout", int(self.timeout_var.get()))
             max_size_mb = int(self.max_size_var.get())
             self.config.set("analysis.max_file_size", max_size_mb * 1024 * 1024)
+            self.config.set("analysis.preprocess_profile", self.profile_var.get())
             
             self.destroy()
             self.master.show_success("Settings saved successfully")
@@ -201,10 +217,19 @@ class IntegrityUI(ctk.CTk):
         self.loading_overlay: Optional[LoadingOverlay] = None
         self.user_info: Optional[Dict[str, Any]] = None
         
+        # Async handlers run on the shared event loop thread; their results
+        # and UI updates come back to the Tk thread through the bridge
+        self.bridge = TkAsyncBridge(self)
+        
         self.setup_window()
         self.create_widgets()
         self.apply_settings()
         
+        api = getattr(self.app, "api", None)
+        if api is not None and api.config.get("auth_token"):
+            # Restored session: show the account and start sending queued work
+            self.bridge.submit(self.update_user_info_from_server())
+        
         self.logger.info("UI initialized successfully")
     
     def setup_window(self):
@@ -291,7 +316,10 @@ class IntegrityUI(ctk.CTk):
         logout_btn = ctk.CTkButton(
             button_frame,
             text="Logout",
-            command=self.logout
+            command=lambda: self.run_with_loading(
+                self.logout,
+                "Logging out..."
+            )
         )
         logout_btn.pack(side="right", padx=5)
     
@@ -327,26 +355,34 @@ class IntegrityUI(ctk.CTk):
             icon="check"
         )
     
+    def show_info(self, message: str):
+        self.logger.info(message)
+        ctk.CTkMessagebox(
+            title="Info",
+            message=message,
+            icon="info"
+        )
+    
     def run_with_loading(self, func: Callable, loading_message: str = "Processing..."):
-        def wrapper():
-            try:
-                self.show_loading(loading_message)
-                result = func()
-                self.hide_loading()
-                return result
-            except Exception as e:
-                self.logger.error("Operation failed", exc_info=True)
-                self.hide_loading()
-                self.show_error(f"Operation failed: {str(e)}")
-                return None
-        
-        thread = threading.Thread(target=wrapper)
-        thread.daemon = True
-        thread.start()
+        """
+        Run an async handler (or a blocking function, in a worker thread) on
+        the event loop thread behind the loading overlay
+        """
+        def on_error(error: BaseException):
+            self.logger.error("Operation failed", exc_info=error)
+            self.hide_loading()
+            self.show_error(f"Operation failed: {str(error)}")
+        
+        async def run_blocking():
+            return await asyncio.get_running_loop().run_in_executor(None, func)
+        
+        self.show_loading(loading_message)
+        coro = func() if asyncio.iscoroutinefunction(func) else run_blocking()
+        return self.bridge.submit(coro, on_done=lambda result: self.hide_loading(), on_error=on_error)
     
     async def start_analysis(self):
         self.logger.info("Starting analysis...")
-        self.update_status("Analysis in progress...")
+        self.bridge.call_in_ui(self.update_status, "Analysis in progress...")
         
         try:
             # Get screenshot or other analysis data
@@ -356,16 +392,22 @@ class IntegrityUI(ctk.CTk):
             result = await self.app.api.send_analysis(analysis_data)
             
             if result["status"] == "success":
-                self.show_success("Analysis completed successfully!")
+                self.bridge.call_in_ui(self.show_success, "Analysis completed successfully!")
                 # Update remaining questions count
-                await self.update_user_info()
+                await self.update_user_info_from_server()
+            elif result["status"] == "queued":
+                # Accepted while offline; the outbox delivers it once the server is reachable
+                self.bridge.call_in_ui(
+                    self.show_info, "The server is unreachable. Your analysis was saved and will be sent automatically."
+                )
+                await self.update_user_info_from_server()
             else:
-                self.show_error(f"Analysis failed: {result.get('message', 'Unknown error')}")
+                self.bridge.call_in_ui(self.show_error, f"Analysis failed: {result.get('message', 'Unknown error')}")
         except Exception as e:
             self.logger.error("Analysis failed", exc_info=True)
-            self.show_error(f"Analysis failed: {str(e)}")
+            self.bridge.call_in_ui(self.show_error, f"Analysis failed: {str(e)}")
         finally:
-            self.update_status("Ready")
+            self.bridge.call_in_ui(self.update_status, "Ready")
     
     def open_settings(self):
         self.logger.info("Opening settings...")
@@ -374,12 +416,11 @@ class IntegrityUI(ctk.CTk):
     async def logout(self):
         try:
             await self.app.api.logout()
-            self.user_info = None
-            self.update_user_label()
-            self.app.show_login_dialog()
+            self.bridge.call_in_ui(self.update_user_info, None)
+            self.bridge.call_in_ui(self.app.show_login_dialog)
         except Exception as e:
             self.logger.error(f"Logout failed: {e}")
-            self.show_error(f"Logout failed: {str(e)}")
+            self.bridge.call_in_ui(self.show_error, f"Logout failed: {str(e)}")
     
     def update_user_info(self, profile_data: Dict[str, Any] = None):
         """Update user information display"""
@@ -406,10 +447,21 @@ class IntegrityUI(ctk.CTk):
         try:
             profile = await self.app.api.get_user_profile()
             if profile["status"] == "success":
-                self.update_user_info(profile["data"])
+                self.bridge.call_in_ui(self.update_user_info, profile["data"])
         except Exception as e:
             self.logger.error(f"Failed to update user info: {e}")
     
+    def destroy(self):
+        self.bridge.close()
+        api = getattr(self.app, "api", None)
+        if api is not None:
+            # Send buffered usage rows before the event loop goes away
+            try:
+                self.bridge.loop_thread.run(api.close(), timeout=10)
+            except Exception as e:
+                self.logger.error(f"Failed to close API client: {e}")
+        super().destroy()
+    
     def apply_settings(self):
         """Apply current settings to the UI"""
         theme = self.config.get("theme", "dark")
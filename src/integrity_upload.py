@@ -0,0 +1,196 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Union
+import numpy as np
+import cv2
+from integrity_preprocess import PREPROCESS_PROFILES, DEFAULT_PROFILE, to_gray, dirty_tile_mask
+
+IMAGE_FORMATS = {
+    "webp": (".webp", "image/webp"),
+    "jpeg": (".jpg", "image/jpeg"),
+    "png": (".png", "image/png"),
+}
+
+class UploadEncoder:
+    """
+    Shrinks screenshots before they are uploaded for analysis.
+
+    Frames are downscaled to max_dimension, optionally reduced to grayscale
+    or binarized with an OCR preprocessing profile, and encoded as WebP,
+    JPEG or PNG. Binarized frames are always stored losslessly, since lossy
+    codecs smear the hard edges and compress them worse.
+
+    With changed_tiles_only, only the bounding box of the tiles that
+    changed since the last frame the server confirmed is sent, along with
+    its position in the full frame; frames identical to the last one
+    encoded are not uploaded at all. The caller confirms delivery with
+    commit() and calls reset() after a failure, so the next upload is a
+    full frame instead of a diff against a frame the server never got.
+    """
+
+    def __init__(self, max_dimension: int = 1920, color_mode: str = "gray", image_format: str = "webp",
+                 quality: int = 80, profile: str = DEFAULT_PROFILE, changed_tiles_only: bool = False,
+                 tile_size: int = 64, diff_threshold: int = 32):
+        if color_mode not in ("color", "gray", "binary"):
+            raise ValueError(f"Unknown upload color mode: {color_mode}")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown upload image format: {image_format}")
+
+        self.max_dimension = int(max_dimension)
+        self.color_mode = color_mode
+        self.image_format = image_format
+        self.quality = int(quality)
+        self.profile = profile if profile in PREPROCESS_PROFILES else DEFAULT_PROFILE
+        self.changed_tiles_only = changed_tiles_only
+        self.tile_size = int(tile_size)
+        self.diff_threshold = int(diff_threshold)
+        self.logger = logging.getLogger("IntegrityCore.UploadEncoder")
+        # Last frame the server confirmed (diff base) and last frame encoded
+        self._previous: Optional[np.ndarray] = None
+        self._last_encoded: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Downscale and convert a BGR(A) frame to the configured color mode"""
+        h, w = frame.shape[:2]
+        scale = self.max_dimension / max(h, w) if self.max_dimension > 0 else 1.0
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+
+        if self.color_mode == "binary":
+            return PREPROCESS_PROFILES[self.profile](frame)
+        if self.color_mode == "gray":
+            return to_gray(frame)
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return frame
+
+    def _dirty_mask(self, image: np.ndarray, previous: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if previous is None or previous.shape != image.shape:
+            return None
+        return dirty_tile_mask(to_gray(image), to_gray(previous), self.tile_size, self.diff_threshold)
+
+    def _changed_region(self, image: np.ndarray) -> Optional[Dict[str, int]]:
+        """
+        Bounding box of the tiles that changed since the last confirmed upload;
+        the caller holds _lock
+        Returns:
+            Region dict, the full frame if there is nothing to diff against,
+            or None if nothing changed since the last frame encoded
+        """
+        h, w = image.shape[:2]
+        full = {"left": 0, "top": 0, "width": w, "height": h}
+        last_mask = self._dirty_mask(image, self._last_encoded)
+        if last_mask is not None and not last_mask.any():
+            return None
+        self._last_encoded = image
+
+        mask = self._dirty_mask(image, self._previous)
+        if mask is None:
+            return full
+        if not mask.any():
+            # Back to the frame the server already has
+            return None
+
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        left, top = int(cols[0]) * self.tile_size, int(rows[0]) * self.tile_size
+        right = min(w, (int(cols[-1]) + 1) * self.tile_size)
+        bottom = min(h, (int(rows[-1]) + 1) * self.tile_size)
+        return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+    def _encode(self, image: np.ndarray) -> bytes:
+        extension = IMAGE_FORMATS[self.image_format][0]
+        if self.image_format == "png":
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 6]
+        elif self.image_format == "webp":
+            # OpenCV switches WebP to lossless above quality 100
+            params = [cv2.IMWRITE_WEBP_QUALITY, 101 if self.color_mode == "binary" else self.quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+
+        ok, buffer = cv2.imencode(extension, image, params)
+        if not ok:
+            raise RuntimeError(f"Failed to encode upload as {self.image_format}")
+        return buffer.tobytes()
+
+    def encode(self, image: Union[bytes, np.ndarray]) -> Optional[Dict[str, Any]]:
+        """
+        Encode a screenshot for upload
+        Args:
+            image: Encoded image bytes (e.g. PNG) or a BGR/BGRA frame
+        Returns:
+            Dict with data, filename, content_type, the frame size after
+            scaling, the region sent and original/encoded byte counts, or
+            None if changed_tiles_only is set and nothing changed
+        """
+        if isinstance(image, (bytes, bytearray)):
+            original_bytes = len(image)
+            baseline = "encoded input"
+            frame = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                raise ValueError("Could not decode screenshot for upload")
+        else:
+            # Encoding a PNG just to measure it would cost more than the
+            # upload, so savings on frames are against the raw pixels
+            frame = image
+            original_bytes = frame.nbytes
+            baseline = "raw frame"
+
+        prepared = self._prepare(frame)
+        h, w = prepared.shape[:2]
+        region = {"left": 0, "top": 0, "width": w, "height": h}
+        if self.changed_tiles_only:
+            with self._lock:
+                region = self._changed_region(prepared)
+            if region is None:
+                return None
+        return self._build(prepared, region, original_bytes, baseline)
+
+    def _build(self, prepared: np.ndarray, region: Dict[str, int], original_bytes: int,
+               baseline: str) -> Dict[str, Any]:
+        crop = prepared[region["top"]:region["top"] + region["height"],
+                        region["left"]:region["left"] + region["width"]]
+        data = self._encode(crop)
+        extension, content_type = IMAGE_FORMATS[self.image_format]
+        saved = original_bytes - len(data)
+        self.logger.debug(
+            f"Upload encoded to {len(data)} bytes from {original_bytes} ({baseline}, "
+            f"{saved / max(original_bytes, 1):.0%} saved)"
+        )
+        h, w = prepared.shape[:2]
+        return {
+            "data": data,
+            "filename": f"screenshot{extension}",
+            "content_type": content_type,
+            "frame_size": (w, h),
+            "region": region,
+            "original_bytes": original_bytes,
+            "encoded_bytes": len(data),
+            "saved_bytes": saved,
+            "baseline": baseline,
+            "frame": prepared
+        }
+
+    def full_frame(self, upload: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-encode an upload as the whole frame, for uploads delivered out of order"""
+        w, h = upload["frame_size"]
+        if upload["region"] == {"left": 0, "top": 0, "width": w, "height": h}:
+            return upload
+        return self._build(upload["frame"], {"left": 0, "top": 0, "width": w, "height": h},
+                           upload["original_bytes"], upload["baseline"])
+
+    def commit(self, upload: Dict[str, Any]):
+        """Make a delivered upload the base for the next changed-tiles diff"""
+        with self._lock:
+            self._previous = upload["frame"]
+
+    def reset(self):
+        """
+        Forget the diff base after a failed upload, so the next one is a full
+        frame, and the frame that failed is not skipped as unchanged
+        """
+        with self._lock:
+            self._previous = None
+            self._last_encoded = None
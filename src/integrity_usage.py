@@ -0,0 +1,233 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+class UsageBuffer:
+    """
+    Local buffer for usage_tracking rows, written to Supabase in multi-row
+    inserts instead of one insert per action.
+
+    Every event is appended to a JSON-lines file before it is queued, so
+    events survive crashes and offline periods; the file is rewritten with
+    whatever is left after each successful flush. A flush starts once
+    max_batch events are pending, flush_interval seconds after the first
+    unsent event, or on close(). After close() nothing is sent until
+    start() is called, e.g. on the next login.
+
+    When the server rejects a batch outright, the batch is split in halves
+    until the offending rows are isolated. Those rows are moved to a
+    .rejected file next to the buffer so they cannot block later events.
+    """
+
+    def __init__(self, path: str, send: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+                 max_batch: int = 50, flush_interval: float = 60.0,
+                 is_rejected: Optional[Callable[[Exception], bool]] = None):
+        """
+        Args:
+            path: JSON-lines file holding pending events
+            send: Writes a list of rows to usage_tracking
+            max_batch: Rows per insert
+            flush_interval: Max seconds an event waits before it is sent
+            is_rejected: Tells a permanent rejection from a transient
+                failure; by default only HTTP 4xx statuses count
+        """
+        self.path = path
+        self.send = send
+        self.is_rejected = is_rejected or self._rejected_status
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger("IntegrityCore.UsageBuffer")
+        self._lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.events: List[Dict[str, Any]] = self._load()
+        if self.events:
+            self.logger.info(f"{len(self.events)} usage events pending from a previous session")
+
+    def _load(self) -> List[Dict[str, Any]]:
+        events = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # A torn last line from a crash mid-write
+                        self.logger.warning("Skipping corrupt usage event")
+        except FileNotFoundError:
+            pass
+        return events
+
+    @staticmethod
+    def _rejected_status(error: Exception) -> bool:
+        status = getattr(error, "status", None)
+        return isinstance(status, int) and 400 <= status < 500 and status not in (408, 425, 429)
+
+    def _rewrite(self):
+        """Replace the file with the events still pending; caller holds _lock"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        os.replace(temp_path, self.path)
+
+    def add(self, user_id: str, action_type: str, action_details: Dict[str, Any]):
+        """
+        Queue one usage_tracking row. Must be called from the event loop
+        that flushes the buffer.
+        """
+        event = {
+            "user_id": user_id,
+            "action_type": action_type,
+            "action_details": action_details,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        with self._lock:
+            self.events.append(event)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+            pending = len(self.events)
+
+        if self._closed:
+            # Kept on disk and sent after the next start()
+            return
+        if pending >= self.max_batch:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        else:
+            self.schedule_flush()
+
+    def discard_other_users(self, user_id: str) -> int:
+        """
+        Drop pending events recorded for anyone but user_id, e.g. left over
+        from another account; they could never be written as this user
+        Returns:
+            Number of events discarded
+        """
+        with self._lock:
+            kept = [event for event in self.events if event.get("user_id") == user_id]
+            discarded = len(self.events) - len(kept)
+            if discarded:
+                self.events = kept
+                self._rewrite()
+        if discarded:
+            self.logger.warning(f"Discarded {discarded} pending usage events of another user")
+        return discarded
+
+    def start(self):
+        """Resume sending after close() and schedule a flush of pending events"""
+        self._closed = False
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        """Flush pending events after flush_interval unless a flush is already scheduled or the buffer is closed"""
+        if self._closed:
+            return
+        if self.events and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Send pending events in batches of max_batch
+        Returns:
+            Number of events written, 0 if the buffer is closed
+        """
+        if self._closed:
+            return 0
+        return await self._flush()
+
+    async def _flush(self) -> int:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        sent = 0
+        async with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self.events[:self.max_batch]
+                if not batch:
+                    break
+
+                # Rows written or rejected so far, so a failure halfway
+                # through a split batch does not send them again
+                settled: List[Dict[str, Any]] = []
+                rejected: List[Dict[str, Any]] = []
+                try:
+                    await self._send_batch(batch, settled, rejected)
+                    failed = False
+                except Exception as e:
+                    self.logger.warning(f"Usage flush failed, {len(self.events)} events kept for retry: {e}")
+                    failed = True
+
+                if settled:
+                    with self._lock:
+                        if len(settled) == len(batch):
+                            del self.events[:len(batch)]
+                        else:
+                            done = {id(event) for event in settled}
+                            self.events = [event for event in self.events if id(event) not in done]
+                        self._rewrite()
+                if rejected:
+                    self._quarantine(rejected)
+                sent += len(settled) - len(rejected)
+
+                if failed:
+                    self.schedule_flush()
+                    break
+
+        if sent:
+            self.logger.debug(f"Flushed {sent} usage events")
+        return sent
+
+    async def _send_batch(self, batch: List[Dict[str, Any]], settled: List[Dict[str, Any]],
+                          rejected: List[Dict[str, Any]]):
+        """Send batch, splitting it to isolate rows the server rejects; transient failures propagate"""
+        try:
+            await self.send(batch)
+            settled.extend(batch)
+            return
+        except Exception as e:
+            if not self.is_rejected(e):
+                raise
+            if len(batch) == 1:
+                self.logger.error(f"Usage event rejected by the server: {e}")
+                settled.extend(batch)
+                rejected.extend(batch)
+                return
+
+        middle = len(batch) // 2
+        await self._send_batch(batch[:middle], settled, rejected)
+        await self._send_batch(batch[middle:], settled, rejected)
+
+    def _quarantine(self, events: List[Dict[str, Any]]):
+        """Keep rejected events aside for inspection instead of retrying them forever"""
+        try:
+            with open(self.path + ".rejected", "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        except OSError as e:
+            self.logger.error(f"Failed to quarantine rejected usage events: {e}")
+        self.logger.warning(f"Moved {len(events)} rejected usage events to {self.path}.rejected")
+
+    async def close(self):
+        """
+        Cancel the flush timer and send everything still pending. Events a
+        failed final flush leaves behind wait on disk for the next start()
+        instead of being retried, e.g. after the user has signed out.
+        """
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self._flush()
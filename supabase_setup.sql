@@ -63,4 +63,32 @@ CREATE POLICY "Users can insert their own usage data"
 CREATE POLICY "Users can view their own usage data" 
   ON usage_tracking 
   FOR SELECT 
-  USING (auth.uid() = user_id); 
\ No newline at end of file
+  USING (auth.uid() = user_id); 
+
+-- Atomically charge questions to the caller's quota, never past questions_limit;
+-- questions over the limit are not charged. Returns the updated profile.
+CREATE OR REPLACE FUNCTION public.increment_questions_used(amount INT DEFAULT 1)
+RETURNS user_profiles AS $$
+DECLARE
+  profile user_profiles;
+BEGIN
+  IF amount < 1 THEN
+    RAISE EXCEPTION 'amount must be positive';
+  END IF;
+
+  UPDATE user_profiles
+  SET questions_used = GREATEST(questions_used, LEAST(questions_used + amount, questions_limit)),
+      last_question_time = NOW(),
+      updated_at = NOW()
+  WHERE user_id = auth.uid()
+  RETURNING * INTO profile;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'user profile not found' USING ERRCODE = 'no_data_found';
+  END IF;
+
+  RETURN profile;
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+GRANT EXECUTE ON FUNCTION public.increment_questions_used(INT) TO authenticated;
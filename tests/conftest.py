@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from integrity_config import ConfigManager
+from integrity_mock_server import MockServer
+
+EMAIL = "test@example.com"
+PASSWORD = "password"
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    """Keep settings, quota, usage and outbox files out of the real home directory"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    monkeypatch.setattr(ConfigManager, "_instance", None)
+    return tmp_path
+
+
+@pytest.fixture
+def server():
+    with MockServer() as server:
+        server.state.add_user(EMAIL, PASSWORD)
+        yield server
+
+
+@pytest.fixture
+def make_api(tmp_path, server):
+    """Factory for IntegrityAPI instances talking to the mock server and sharing one config.json"""
+    from integrity_api import IntegrityAPI
+
+    ConfigManager.get_instance().set("network.api_base_url", server.url)
+    config_dir = tmp_path / "api_config"
+    config_dir.mkdir()
+    (config_dir / "config.json").write_text(json.dumps({
+        "supabase_url": server.url,
+        "supabase_key": server.state.anon_key
+    }))
+
+    class MockedAPI(IntegrityAPI):
+        def _load_config(self):
+            self.config_dir = str(config_dir)
+            super()._load_config()
+
+    return MockedAPI
@@ -0,0 +1,53 @@
+import asyncio
+import inspect
+
+from conftest import EMAIL, PASSWORD
+
+
+def test_set_session_signature_of_pinned_client(make_api):
+    api = make_api()
+    # supabase 2.0.0 ships a synchronous client; awaiting its result fails
+    assert not inspect.iscoroutinefunction(api.supabase.auth.set_session)
+    assert list(inspect.signature(api.supabase.auth.set_session).parameters) == ["access_token", "refresh_token"]
+
+
+def test_login_hands_session_to_supabase_client(make_api):
+    async def run():
+        api = make_api()
+        result = await api.login(EMAIL, PASSWORD)
+        assert result["status"] == "success"
+        session = api.supabase.auth.get_session()
+        assert session is not None and session.access_token == api.config["auth_token"]
+        await api.close()
+
+    asyncio.run(run())
+
+
+def test_restored_session_reaches_supabase_client(make_api):
+    async def run():
+        first = make_api()
+        assert (await first.login(EMAIL, PASSWORD))["status"] == "success"
+        await first.close()
+
+        restored = make_api()
+        assert restored.supabase.auth.get_session() is None
+        assert await restored.verify_session()
+        session = restored.supabase.auth.get_session()
+        assert session is not None and session.access_token == first.config["auth_token"]
+        await restored.close()
+
+    asyncio.run(run())
+
+
+def test_refreshed_session_reaches_supabase_client(make_api):
+    async def run():
+        api = make_api()
+        assert (await api.login(EMAIL, PASSWORD))["status"] == "success"
+        old_refresh_token = api.config["refresh_token"]
+        assert await api.session.refresh()
+        assert api.config["refresh_token"] != old_refresh_token
+        session = api.supabase.auth.get_session()
+        assert session.refresh_token == api.config["refresh_token"]
+        await api.close()
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+import asyncio
+
+from conftest import EMAIL, PASSWORD
+
+
+def test_login_and_send_analysis(make_api, server):
+    async def run():
+        api = make_api()
+        login = await api.login(EMAIL, PASSWORD)
+        assert login["status"] == "success"
+        assert login["data"].email == EMAIL
+
+        result = await api.send_analysis({"text": "What is on screen?"})
+        assert result["status"] == "success"
+        assert result["data"]["answer"] == "Mock analysis result"
+
+        profile = await api.get_user_profile()
+        assert profile["status"] == "success"
+        assert profile["data"]["questions_used"] == 1
+
+        # close() flushes the usage row and syncs the question to the server
+        await api.close()
+
+    asyncio.run(run())
+
+    user_id = server.state.users[EMAIL]["id"]
+    assert [a["kind"] for a in server.state.analyses] == ["analysis"]
+    assert [row["action_type"] for row in server.state.tables["usage_tracking"]] == ["analysis"]
+    assert server.state.tables["user_profiles"][0]["user_id"] == user_id
+    assert server.state.tables["user_profiles"][0]["questions_used"] == 1
+
+
+def test_login_with_wrong_password(make_api):
+    async def run():
+        api = make_api()
+        result = await api.login(EMAIL, "wrong")
+        assert result["status"] == "error"
+        await api.close()
+
+    asyncio.run(run())
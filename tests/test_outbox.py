@@ -0,0 +1,31 @@
+import asyncio
+
+from conftest import EMAIL, PASSWORD
+from integrity_config import ConfigManager
+
+
+def test_restored_session_sends_backlog(make_api, server):
+    ConfigManager.get_instance().set("network.usage_flush_interval", 0.01)
+
+    async def run():
+        first = make_api()
+        assert (await first.login(EMAIL, PASSWORD))["status"] == "success"
+        # Queued while the server was unreachable, then the app exited
+        await first.outbox.stop()
+        first.outbox.enqueue("analysis", {"text": "offline"}, user_id=first.config["user_id"])
+        await first.close()
+        first.usage.add(first.config["user_id"], "screen_analysis", {"size": 1})
+
+        restored = make_api()
+        assert restored.outbox.stats()["pending"] == 1
+        assert await restored.verify_session()
+        for _ in range(50):
+            if restored.outbox.stats()["pending"] == 0 and not restored.usage.events:
+                break
+            await asyncio.sleep(0.05)
+        assert restored.outbox.stats()["pending"] == 0
+        await restored.close()
+
+    asyncio.run(run())
+    assert [a["data"] for a in server.state.analyses] == [{"text": "offline"}]
+    assert sorted(row["action_type"] for row in server.state.tables["usage_tracking"]) == ["analysis", "screen_analysis"]
@@ -0,0 +1,67 @@
+import asyncio
+
+from integrity_quota import QuotaTracker
+
+
+def test_failed_close_does_not_reschedule(tmp_path):
+    calls = []
+    online = False
+
+    async def send(amount):
+        calls.append(amount)
+        if not online:
+            raise ConnectionError("offline")
+        return {"questions_limit": 10, "questions_used": amount}
+
+    async def run():
+        nonlocal online
+        quota = QuotaTracker(str(tmp_path / "quota.json"), send, sync_interval=0.01)
+        quota.seed({"user_id": "user", "questions_limit": 10, "questions_used": 0})
+        assert quota.acquire()
+        await quota.close()
+        assert quota._timer is None
+        assert await quota.sync() == 0
+        await asyncio.sleep(0.05)
+        assert calls == [1] and quota.pending == 1
+
+        online = True
+        quota.start()
+        await asyncio.sleep(0.05)
+        assert quota.pending == 0 and quota.used == 1
+
+    asyncio.run(run())
+
+
+def test_sync_charges_up_to_the_limit(make_api, server):
+    from conftest import EMAIL, PASSWORD
+
+    async def run():
+        api = make_api()
+        assert (await api.login(EMAIL, PASSWORD))["status"] == "success"
+        assert (await api.get_user_profile())["status"] == "success"
+        for _ in range(3):
+            assert api.quota.acquire()
+        # Another device used most of the quota in the meantime
+        server.state.tables["user_profiles"][0]["questions_used"] = 8
+        assert await api.quota.sync() == 3
+        assert api.quota.pending == 0
+        assert api.quota.seeded and api.quota.used == 10
+        await api.close()
+
+    asyncio.run(run())
+    assert server.state.tables["user_profiles"][0]["questions_used"] == 10
+
+
+def test_missing_profile_is_rejected(make_api, server):
+    from conftest import EMAIL, PASSWORD
+
+    async def run():
+        api = make_api()
+        assert (await api.login(EMAIL, PASSWORD))["status"] == "success"
+        server.state.tables["user_profiles"].clear()
+        assert api.quota.acquire()
+        assert await api.quota.sync() == 0
+        assert api.quota.pending == 0 and not api.quota.seeded
+        await api.close()
+
+    asyncio.run(run())
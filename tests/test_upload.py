@@ -0,0 +1,38 @@
+import numpy as np
+
+from integrity_upload import UploadEncoder
+
+
+def _frames():
+    first = np.zeros((200, 300, 3), np.uint8)
+    second = first.copy()
+    second[100:110, 100:110] = 255
+    return first, second
+
+
+def test_unchanged_frame_is_skipped():
+    encoder = UploadEncoder(changed_tiles_only=True)
+    first, _ = _frames()
+    encoder.commit(encoder.encode(first))
+    assert encoder.encode(first) is None
+
+
+def test_diff_against_committed_frame():
+    encoder = UploadEncoder(changed_tiles_only=True)
+    first, second = _frames()
+    encoder.commit(encoder.encode(first))
+    upload = encoder.encode(second)
+    assert upload["region"] == {"left": 64, "top": 64, "width": 64, "height": 64}
+    assert encoder.full_frame(upload)["region"] == {"left": 0, "top": 0, "width": 300, "height": 200}
+
+
+def test_same_frame_is_sent_again_after_failed_upload():
+    encoder = UploadEncoder(changed_tiles_only=True)
+    first, second = _frames()
+    encoder.commit(encoder.encode(first))
+    assert encoder.encode(second) is not None
+    # The upload failed, so the server never received the frame
+    encoder.reset()
+    retry = encoder.encode(second)
+    assert retry is not None
+    assert retry["region"] == {"left": 0, "top": 0, "width": 300, "height": 200}
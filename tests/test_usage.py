@@ -0,0 +1,52 @@
+import asyncio
+
+from integrity_usage import UsageBuffer
+
+
+def test_failed_close_does_not_reschedule(tmp_path):
+    sent = []
+    online = False
+
+    async def send(rows):
+        if not online:
+            raise ConnectionError("offline")
+        sent.extend(rows)
+
+    async def run():
+        nonlocal online
+        buffer = UsageBuffer(str(tmp_path / "usage.jsonl"), send, flush_interval=0.01)
+        buffer.add("user", "analysis", {})
+        await buffer.close()
+        assert buffer._timer is None
+        assert await buffer.flush() == 0
+        await asyncio.sleep(0.05)
+        assert sent == [] and len(buffer.events) == 1
+
+        # Logging in again resumes delivery
+        online = True
+        buffer.start()
+        await asyncio.sleep(0.05)
+        assert [row["action_type"] for row in sent] == ["analysis"]
+        assert buffer.events == []
+
+    asyncio.run(run())
+
+
+def test_rejected_rows_are_quarantined(tmp_path):
+    class Rejected(Exception):
+        status = 403
+
+    async def send(rows):
+        if any(row["user_id"] != "user" for row in rows):
+            raise Rejected("row-level security")
+
+    async def run():
+        buffer = UsageBuffer(str(tmp_path / "usage.jsonl"), send)
+        for user_id in ("user", "other", "user"):
+            buffer.add(user_id, "analysis", {})
+        assert await buffer.flush() == 2
+        assert buffer.events == []
+        await buffer.close()
+
+    asyncio.run(run())
+    assert (tmp_path / "usage.jsonl.rejected").read_text().count("\n") == 1